@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from contextlib import contextmanager
+from typing import Dict, List
+from openpyxl.utils import column_index_from_string
+from workbook import WorkbookCache
+from header import HEADER_REGIONS, extract_furnace_data, get_furnace_identifier
+from data import CONTAINER_REGIONS, GlassProductionAnalyzer
+from defects_actions import DEFECTS_REGIONS, column_mapping, extract_defects, join_non_empty
+from pipeline import ALL_REGIONS, extract_workbook
+from readers import CalamineWorkbook
+from synthetic import generate_workbook
+
+
+class StageTimer:
+    """Collect wall time and peak traced memory for named benchmark stages."""
+    def __init__(self, trace_memory: bool = True):
+        """
+        Args:
+            trace_memory (bool): Record peak memory with tracemalloc (slows Python-heavy stages down)
+        """
+        self.trace_memory = trace_memory
+        self.results: List[Dict[str, object]] = []
+
+    @contextmanager
+    def stage(self, extractor: str, stage: str):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            self.results.append({"extractor": extractor, "stage": stage, "seconds": round(seconds, 4),
+                                 "peak_mb": round(peak / (1 << 20), 2) if peak is not None else None})
+
+
+def bench_extractor(timer: StageTimer, name: str, file_path: str, regions, extract) -> None:
+    """Time opening the workbook, decoding every sheet, and the extractor's transform on the decoded grids."""
+    with timer.stage(name, "open"):
+        workbook = WorkbookCache(file_path, regions)
+    with workbook:
+        with timer.stage(name, "read"):
+            for sheet in workbook.sheet_names:
+                workbook.grid(sheet)
+        with timer.stage(name, "transform"):
+            extract(workbook)
+
+
+def _join_rowwise(block: pd.DataFrame) -> pd.Series:
+    # The per-row apply defects_actions.py used before join_non_empty
+    return block.apply(lambda row: ' '.join(row.dropna().astype(str)), axis=1)
+
+
+def bench_defects_merge(timer: StageTimer, file_path: str) -> None:
+    """Compare the row-wise and column-wise defects merges on every sheet and check they agree."""
+    with WorkbookCache(file_path, DEFECTS_REGIONS) as workbook:
+        blocks = []
+        for sheet in workbook.sheet_names:
+            grid = workbook.str_grid(sheet)
+            for excel_cols in column_mapping.values():
+                blocks.append(grid.iloc[:, [column_index_from_string(col) - 1 for col in excel_cols]])
+    with timer.stage("defects_merge", "rowwise_apply"):
+        expected = [_join_rowwise(block) for block in blocks]
+    with timer.stage("defects_merge", "vectorized"):
+        actual = [join_non_empty(block) for block in blocks]
+    for e, a in zip(expected, actual):
+        pd.testing.assert_series_equal(e, a, check_dtype=False, check_names=False)
+
+
+def available_engines() -> List[str]:
+    return ["openpyxl"] + (["calamine"] if CalamineWorkbook is not None else [])
+
+
+def bench_engines(file_path: str, engines: List[str]) -> List[Dict[str, object]]:
+    """
+    Time decoding every sheet (the regions of all three extractors) with each reader engine,
+    and check that the extracted tables are identical to openpyxl's.
+    Returns:
+        List[Dict[str, object]]: engine, sheets, seconds, sheets/s and MB/s (of the .xlsx file) per engine
+    """
+    size_mb = os.path.getsize(file_path) / (1 << 20)
+    results, expected = [], None
+    for engine in engines:
+        start = time.perf_counter()
+        with WorkbookCache(file_path, ALL_REGIONS, engine=engine) as workbook:
+            for sheet in workbook.sheet_names:
+                workbook.grid(sheet)
+            seconds = time.perf_counter() - start
+            tables = extract_workbook(workbook, 1)
+        if expected is None:
+            expected = tables
+        for name, df in tables.items():
+            pd.testing.assert_frame_equal(expected[name], df, obj=f"{name} ({engine})")
+        results.append({"engine": engine, "sheets": len(workbook.sheet_names), "seconds": round(seconds, 3),
+                        "sheets_per_s": round(len(workbook.sheet_names) / seconds, 1),
+                        "mb_per_s": round(size_mb / seconds, 2)})
+    return results
+
+
+def run_benchmark(file_path: str, trace_memory: bool = True) -> List[Dict[str, object]]:
+    """Benchmark header.py, data.py, defects_actions.py and the combined pipeline on one workbook."""
+    timer = StageTimer(trace_memory)
+    furnace = get_furnace_identifier(os.path.basename(file_path))
+    bench_extractor(timer, "header", file_path, HEADER_REGIONS, lambda wb: extract_furnace_data(wb, furnace))
+    bench_extractor(timer, "containers", file_path, CONTAINER_REGIONS,
+                    lambda wb: GlassProductionAnalyzer(file_path, wb).process_all_sheets())
+    bench_extractor(timer, "defects", file_path, DEFECTS_REGIONS, extract_defects)
+    bench_extractor(timer, "pipeline", file_path, ALL_REGIONS, lambda wb: extract_workbook(wb, 1))
+    bench_defects_merge(timer, file_path)
+    return timer.results
+
+
+def print_results(results: List[Dict[str, object]]) -> None:
+    print(f"\n{'extractor':14} {'stage':14} {'seconds':>9} {'peak MB':>9}")
+    for result in results:
+        peak = f"{result['peak_mb']:>9.2f}" if result["peak_mb"] is not None else f"{'-':>9}"
+        print(f"{result['extractor']:14} {result['stage']:14} {result['seconds']:>9.3f} {peak}")
+
+
+def print_engines(results: List[Dict[str, object]]) -> None:
+    print(f"\n{'engine':14} {'sheets':>6} {'seconds':>9} {'sheets/s':>9} {'MB/s':>7}")
+    for result in results:
+        print(f"{result['engine']:14} {result['sheets']:>6} {result['seconds']:>9.3f} "
+              f"{result['sheets_per_s']:>9.1f} {result['mb_per_s']:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the JG extractors on a synthetic (or given) workbook.")
+    parser.add_argument("--workbook", help="Benchmark this workbook instead of generating one")
+    parser.add_argument("--sheets", type=int, default=365)
+    parser.add_argument("--machines", type=int, default=10)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc for undistorted timings")
+    parser.add_argument("--engines", nargs="+", choices=("openpyxl", "calamine"),
+                        help="Reader engines to compare (default: every installed one)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = args.workbook
+        if file_path is None:
+            file_path = os.path.join(tmp, "F1 PROD REPORT SYNTHETIC.xlsx")
+            start = time.perf_counter()
+            generate_workbook(file_path, sheets=args.sheets, machines=args.machines)
+            print(f":white_check_mark: Generated {args.sheets} sheets in {time.perf_counter() - start:.1f}s")
+        results = run_benchmark(file_path, trace_memory=not args.no_memory)
+        engines = bench_engines(file_path, args.engines or available_engines())
+    print_results(results)
+    print_engines(engines)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"workbook": args.workbook or "synthetic", "sheets": args.sheets,
+                       "machines": args.machines, "results": results, "engines": engines}, f, indent=2)
@@ -0,0 +1,9 @@
+# Database connection details for the COPY loader (pgcopy.py, `pipeline.py --sink copy`).
+# Replace with your actual values, or set JG_PG_DSN to override them.
+DB_CONFIG = {
+    "host": "aws-0-ap-south-1.pooler.supabase.com",
+    "port": "6543",
+    "dbname": "postgres",
+    "user": "postgres.sksyzcsstxtirchbuulk",
+    "password": "transaction"
+}
@@ -1,4 +1,3 @@
-from main import supabase  # Import the Supabase client from main.py
 import json
 
 
@@ -8,42 +7,49 @@ import pandas as pd
 import numpy as np
 import re
 # from tabulate import tabulate
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from workbook import Region, WorkbookCache
+from schema import CONTAINERS_DATA, apply_schema, compact_table
+import instrument
+# Cells read from each sheet: the date in V8 and the table from the header row (15) to "Total"
+# (WorkbookCache.layout finds the exact rows, so a shifted sheet is still covered)
+CONTAINER_REGIONS = [
+    Region("date", min_row=1, max_row=14, min_col="V", max_col="V"),
+    Region("containers", min_row=15, stop_cols=("B", "C"), stop_pattern=r"^\s*Total\s*$"),
+]
+_is_blank_text = np.frompyfunc(lambda value: isinstance(value, str) and not value.strip(), 1, 1)
+def _ffill_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Treat blank text as empty and forward-fill raw cells column by column, without letting
+    pandas re-infer dtypes on the way (whole numbers would come back as floats).
+    """
+    values = df.to_numpy(dtype=object, copy=True)
+    missing = pd.isna(values) | _is_blank_text(values).astype(bool)
+    values[missing] = np.nan
+    last_valid = np.where(~missing, np.arange(len(df))[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    return pd.DataFrame(values[last_valid, np.arange(values.shape[1])], index=df.index, columns=df.columns)
+def sheet_slices(sheet_names: List[str], workers: int) -> List[List[str]]:
+    """Split sheet_names into at most workers contiguous slices, in order."""
+    chunk_size = -(-len(sheet_names) // workers)  # Ceiling division
+    return [sheet_names[i:i + chunk_size] for i in range(0, len(sheet_names), chunk_size)]
 class GlassProductionAnalyzer:
     """Process and analyze glass production data from Excel reports."""
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, workbook: Optional[WorkbookCache] = None):
         """
         Initialize the analyzer with an Excel file path.
         Args:
             file_path (str): Path to the Excel file containing production data
+            workbook (WorkbookCache, optional): Shared cache of decoded sheets; opened from file_path if omitted
         """
         self.file_path = file_path
-        self.xls = pd.ExcelFile(file_path)
-        self.sheet_names = self.xls.sheet_names
-        self.required_columns = [
-            "Mc", "Shift", "Job_Name", "No.Of_Sect", "Speed_Bpm", "Glass_Weight",
-            "Std-_Hrs", "Act-_Hrs", "Furnace_Draw", "Mc_Gob_cut_Output_Furnace_glass_Pull_Ton",
-            "Pack_Ton", "Gob_Cut_Output_Quantity", "Actual_-_Pack_Quantity",
-            "Act_Pack_Eff_%", "Pass_Quantity", "Net_%", "total_pack_quantity"
-        ]
-        self.column_renames = {
-            "Mc_Gob_cut_Output_Furnace_glass_Pull_Ton": "Glass_Pull_Ton",
-            "Pack_Ton": "Pack_Ton",
-            "No.Of_Sect": "number_of_section",
-            "Gob_Cut_Output_Quantity": "Output_ Quantity",
-            "Actual_-_Pack_Quantity": "pack_quantity",
-            "Total_Pack_Qty": "total_pack_quantity",
-            "Std-_Hrs":"standard_hours",
-            "Act-_Hrs": "actual_hours",
-            "Net_%": "net",
-            "Act_Pack_Eff_%": "actual_pack_efficiency"
-        }
-        # Define numeric columns for rounding
-        self.numeric_columns = [
-            "Speed_Bpm", "Glass_Weight", "standard_hours", "actual_hours", "Furnace_Draw",
-            "Glass_Pull_Ton", "Pack_Ton", "Output_Quantity", "pack_quantity",
-            "actual_pack_efficiency", "Pass_Quantity", "net", "total_pack_quantity"
-        ]
+        self.workbook = workbook if workbook is not None else WorkbookCache(file_path)
+        self.workbook.add_regions(CONTAINER_REGIONS)
+        self.sheet_names = self.workbook.sheet_names
+        # Sheet header labels to keep and their jg_containers_data names (schema.CONTAINERS_DATA)
+        self.required_columns = [col.source for col in CONTAINERS_DATA.columns if col.source and col.name != "Date"]
+        self.column_renames = {col.source: col.name for col in CONTAINERS_DATA.columns if col.source and col.source != col.name}
     def process_sheet(self, sheet_name: str) -> pd.DataFrame:
         """
         Process a single sheet from the Excel file.
@@ -52,24 +58,30 @@ class GlassProductionAnalyzer:
         Returns:
             pd.DataFrame: Processed dataframe
         """
-        # Load data
-        df = pd.read_excel(self.file_path, sheet_name=sheet_name, header=None, dtype=str)
-        # :small_blue_diamond: Extract date from (8, V) (row index 7, column index 21)
-        sheet_date = df.iloc[7, 21]
-        # :small_blue_diamond: Set headers and trim first 14 rows
-        df.columns = df.iloc[14]
-        df = df.iloc[15:].reset_index(drop=True)
+        # Load data (raw cell values; converted to the column types once, by the schema)
+        df = self.workbook.grid(sheet_name).copy()  # The grid is shared with the other extractors
+        layout = self.workbook.layout(sheet_name)
+        # :small_blue_diamond: Extract date from (8, V) (row index 7, column index 21 in the standard template)
+        sheet_date = df.iloc[layout.date_row - 1, 21]
+        # :small_blue_diamond: Set headers and keep the rows between the header (row 15) and "Total"
+        df.columns = df.iloc[layout.header_row - 1]
+        end = layout.total_row - 1 if layout.total_row is not None else None
+        df = df.iloc[layout.header_row:end].reset_index(drop=True)
         # :small_blue_diamond: Remove the extra unnamed column before Mc
         if df.columns[0] != "Mc":
             df = df.iloc[:, 1:]
         # :small_blue_diamond: Clean and process the data
-        df = self._clean_columns(df)
-        df = self._filter_data(df)
-        df = self._handle_special_rows(df)
-        df = self._clean_job_names(df)
-        df = self._process_numeric_columns(df)
+        with instrument.stage("clean_filter", sheet_name, rows_in=len(df)) as record:
+            df = self._clean_columns(df)
+            df = self._filter_data(df)
+            df = self._handle_special_rows(df)
+            df = self._clean_job_names(df)
+            record["rows_out"] = len(df)
         # :small_blue_diamond: Insert the extracted Date column
         df.insert(0, "Date", sheet_date)
+        with instrument.stage("numeric_conversion", sheet_name, rows_in=len(df)) as record:
+            df = self._process_numeric_columns(df)
+            record["rows_out"] = len(df)
         return df
     def _clean_columns(self, df: pd.DataFrame) -> pd.DataFrame:
       """Clean column names and drop empty columns."""
@@ -82,23 +94,19 @@ class GlassProductionAnalyzer:
       df = df.rename(columns=self.column_renames)
       return df
     def _filter_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Apply data filters."""
-        total_row_index = df[df.iloc[:, 1].str.strip() == "Total"].index.min()
-        if pd.notna(total_row_index):
-            df = df.loc[:total_row_index-1]
-        df = df.replace(r'^\s*$', np.nan, regex=True)
-        df = df.ffill()
+        """Apply data filters (rows from "Total" on are already cut off by process_sheet)."""
+        df = _ffill_cells(df)  # Blank cells take the value above
         df = df[~df["Job_Name"].astype(str).str.startswith("SD", na=False) & df["Job_Name"].notna()]
         df = df[df["Mc"].astype(str).str.match(r"F\d{2}", na=False)]
         return df
     def _handle_special_rows(self, df: pd.DataFrame) -> pd.DataFrame:
         """Handle special rows like Job change and MC DRAINING."""
         if "number_of_section" in df.columns and "total_pack_quantity" in df.columns:
-            job_change_mask = df["number_of_section"].str.strip() == "Job change"
+            job_change_mask = df["number_of_section"].astype(str).str.strip() == "Job change"
             excluded_columns = ["Mc", "Shift", "Job_Name", "number_of_section", "total_pack_quantity"]
             df.loc[job_change_mask, df.columns.difference(excluded_columns)] = np.nan
         if "Job_Name" in df.columns and "total_pack_quantity" in df.columns:
-            mc_draining_mask = df["Job_Name"].str.strip() == "MC DRAINING"
+            mc_draining_mask = df["Job_Name"].astype(str).str.strip() == "MC DRAINING"
             mc_excluded_columns = [
                 "Mc", "Shift", "Job_Name", "total_pack_quantity", "number_of_section",
                 "Speed_Bpm", "Glass_Weight", "standard_hours", "actual_hours",
@@ -113,26 +121,8 @@ class GlassProductionAnalyzer:
         return df
     
     def _process_numeric_columns(self, df: pd.DataFrame) -> pd.DataFrame:
-      """Process numeric columns including percentages and round to 2 decimal places."""
-      for col in self.numeric_columns:
-          if col in df.columns:
-              df[col] = pd.to_numeric(df[col], errors='coerce')
-              df[col] = df[col].round(2)
-
-      for col in ["net", "actual_pack_efficiency"]:
-          if col in df.columns:
-              df[col] = pd.to_numeric(df[col], errors='coerce') * 100
-              df[col] = df[col].round(2)
-
-      # Convert specific float columns to integer
-      float_to_int_cols = [
-          "Speed_Bpm", "Glass_Weight", "standard_hours", "actual_hours", "Furnace_Draw",
-          "Glass_Pull_Ton", "Pack_Ton", "Output_Quantity", "pack_quantity",
-          "actual_pack_efficiency", "Pass_Quantity", "net"
-      ]
-      for col in float_to_int_cols:
-          if col in df.columns:
-              df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+      """Convert to the jg_containers_data types (percentages x100, rounded, cast to int) and null idle machines."""
+      df = apply_schema(df, CONTAINERS_DATA)
 
       # If "Glass_Pull_Ton" & "Pack_Ton" are 0, set specific columns to NaN
       if "Glass_Pull_Ton" in df.columns and "Pack_Ton" in df.columns:
@@ -144,55 +134,96 @@ class GlassProductionAnalyzer:
 
 
 
-    def process_all_sheets(self, df : pd.DataFrame) -> pd.DataFrame:
+    def _process_sheets_parallel(self, workers: int) -> List[pd.DataFrame]:
+      """Process contiguous slices of sheet_names in a process pool, returning frames in sheet order."""
+      slices = sheet_slices(self.sheet_names, workers)
+      with ProcessPoolExecutor(max_workers=len(slices)) as pool:
+          results = pool.map(_process_sheet_slice, [self.file_path] * len(slices), slices)
+          return [df for frames in results for df in frames]
+
+    def process_all_sheets(self, df: Optional[pd.DataFrame] = None, workers: int = 1, compact: bool = False) -> pd.DataFrame:
+      """
+      Process all sheets, count rows per sheet, sum total rows, and combine them into one DataFrame.
+      Args:
+          df (pd.DataFrame, optional): Unused, kept for backward compatibility
+          workers (int): Number of worker processes; above 1 each worker opens the workbook once
+              and processes a contiguous slice of sheet_names. Sheet order is preserved. Ignored
+              when the shared workbook has already decoded the sheets (e.g. for another extractor),
+              since reusing those grids is cheaper than parsing the file again in every worker.
+          compact (bool): Return the compact analysis form (categorical labels, datetime Date,
+              downcast numbers; see schema.compact_frame) instead of the upload-ready frame
+      """
+      decoded = any(self.workbook.is_decoded(sheet) for sheet in self.sheet_names)
+      if workers > 1 and len(self.sheet_names) > 1 and not decoded:
+          processed = self._process_sheets_parallel(workers)
+      else:
+          processed = (self.process_sheet(sheet) for sheet in self.sheet_names)
+      return self.combine_sheets(processed, compact)
+    def combine_sheets(self, processed: Iterable[pd.DataFrame], compact: bool = False) -> pd.DataFrame:
       """
-      Process all sheets, count rows per sheet, sum total rows, and save as a single CSV file.
+      Combine process_sheet frames (one per sheet, in sheet_names order) into one DataFrame.
       Args:
-          output_csv_path (str): File path to save the combined CSV
+          processed (Iterable[pd.DataFrame]): The processed sheets
+          compact (bool): Return the compact analysis form instead of the upload-ready frame
       """
       all_data = []
       sheet_row_counts = {}
       total_rows = 0
-      for sheet in self.sheet_names:
-          df = self.process_sheet(sheet)
+      for sheet, df in zip(self.sheet_names, processed):
           df["Sheet_Name"] = sheet  # Add sheet name for reference
           row_count = df.shape[0]  # Count rows
           sheet_row_counts[sheet] = row_count
           total_rows += row_count
           all_data.append(df)
       # Combine all sheets into a single DataFrame
-      combined_df = pd.concat(all_data, ignore_index=True)
-      combined_df['Date'] = pd.to_datetime(combined_df['Date'], format="%d.%m.%Y").dt.strftime("%Y.%m.%d") # Changed format to "%d.%m.%Y"
+      with instrument.stage("combine", rows_in=total_rows) as record:
+          combined_df = pd.concat(all_data, ignore_index=True)
+          record["rows_out"] = len(combined_df)
+      #   combined_df.to_csv(output_csv_path, index=False)
 
-      return combined_df
-    #   combined_df.to_csv(output_csv_path, index=False)
-      
       # Print row counts
       print("\n:bar_chart: Row Counts Per Sheet:")
       for sheet, count in sheet_row_counts.items():
           print(f"{sheet}: {count} rows")
       print(f"\n:1234: Total Rows Across All Sheets: {total_rows}")
     #   print(f":white_check_mark: Processed data saved to {output_csv_path}")
+      if compact:
+          return compact_table(combined_df, CONTAINERS_DATA)
+      return combined_df
+    def sheet_records(self, sheet_name: str) -> List[Dict]:
+      """
+      Process one sheet and normalize it for upload like process_all_sheets does for the combined frame.
+      Args:
+          sheet_name (str): Name of the sheet to process
+      Returns:
+          List[Dict]: The sheet's rows with Sheet_Name and NaN replaced by None
+      """
+      df = self.process_sheet(sheet_name)
+      df["Sheet_Name"] = sheet_name  # Add sheet name for reference
+      return df.replace({np.nan: None}).to_dict(orient="records")
+    def iter_records(self) -> Iterator[Tuple[str, List[Dict]]]:
+      """Yield (sheet name, records) one sheet at a time, so only one sheet's rows are held in memory."""
+      for sheet in self.sheet_names:
+          yield sheet, self.sheet_records(sheet)
     def display_results(self, processed_data: Dict[str, pd.DataFrame]) -> None:
         """Display processed results in a formatted table."""
         # for sheet, df in processed_data.items():
             # print(f"\n:pushpin: Sheet: {sheet}")
             # print(tabulate(df, headers="keys", tablefmt="grid"))
+def _process_sheet_slice(file_path: str, sheet_names: List[str]) -> List[pd.DataFrame]:
+    """Worker entry point: open the workbook once and process a slice of its sheets."""
+    with WorkbookCache(file_path, CONTAINER_REGIONS) as workbook:
+        analyzer = GlassProductionAnalyzer(file_path, workbook)
+        return [analyzer.process_sheet(sheet) for sheet in sheet_names]
 # :white_check_mark: Usage example
-analyzer = GlassProductionAnalyzer(r"E:\proj1\F2 PROD REPORT JAN 2025.xlsx")
-# analyzer.process_all_sheets("/content/F1_Jan_Data.csv")
-processed_data = {}   
-for sheet in analyzer.sheet_names:  # Assuming sheet_names is accessible
-    processed_data[sheet] = analyzer.process_sheet(sheet)
-
-analyzer.display_results(processed_data)  # Now pass the populated dictionary
-
-# Process all sheets and get final DataFrame
-final_df = analyzer.process_all_sheets(processed_data)
-
-# Convert DataFrame to dictionary format
-# Convert DataFrame to a list of dictionaries and replace NaN with None
-data_to_insert = analyzer.process_all_sheets(pd.DataFrame()).replace({np.nan: None}).to_dict(orient="records")
+if __name__ == "__main__":
+    from main import supabase  # Import the Supabase client from main.py
+    from writer import BatchWriter
+    analyzer = GlassProductionAnalyzer(r"E:\proj1\F2 PROD REPORT JAN 2025.xlsx")
+    # analyzer.process_all_sheets("/content/F1_Jan_Data.csv")
 
-# Insert data into Supabase
-response = supabase.table("jg_containers_data").insert(data_to_insert).execute()
\ No newline at end of file
+    # Process the sheets one at a time and send each sheet's rows as soon as it is ready
+    with BatchWriter(supabase).stream() as stream:
+        for sheet, records in analyzer.iter_records():
+            stream.send(CONTAINERS_DATA.name, records)
+            analyzer.workbook.evict(sheet)  # Drop the decoded grid once its rows are sent
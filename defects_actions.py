@@ -1,92 +1,121 @@
-from main import supabase  # Import the Supabase client from main.py
 import json
+import numpy as np
 import pandas as pd
 import re
 from openpyxl.utils import column_index_from_string
+from typing import Dict, List
+from workbook import Region, WorkbookCache
+from schema import CONTAINERS_DEFECTS, apply_schema, compact_table
+import instrument
 # from tabulate import tabulate
 # === Step 1: Define File Path ===
 file_path = r"E:\proj1\F2 PROD REPORT JAN 2025.xlsx"
 # === Step 2: Read All Sheets ===
-xls = pd.ExcelFile(file_path)
-all_sheets = xls.sheet_names  # Get all sheet names
+# Sheets are decoded once by WorkbookCache and shared with the other extractors.
+# Only the date in V8 and B..X from the "Shift" header down to the "Da..." row are read.
+# The exact rows come from WorkbookCache.layout.
+DEFECTS_REGIONS = [
+    Region("date", min_row=1, max_row=14, min_col="V", max_col="V"),
+    Region("defects", min_row=2, min_col="B", max_col="X", start_col="F", start_pattern=r"(?i)^\s*Shift\s*$",
+           stop_cols=("B",), stop_pattern=r"^\s*Da"),
+]
 # === Step 3: Define Column Mapping ===
-column_mapping = {
-    "MC": ["B"],
-    "Job_Name": ["C", "D", "E"],  # Renamed Ignore1 -> Job_Name
-    "Shift": ["F"],
-    "IC_Percent": ["G"],  # Renamed IC% -> IC_Percent
-    "IM_Percent": ["H"],  # Renamed IM% -> IM_Percent
-    "Defects_and_actions": ["I", "J", "K", "L", "M"],  # Merge multiple columns into a single string
-    "Stopages": ["N", "O", "P", "Q", "R", "S", "T", "U", "V", "W"],  # Merge multiple columns into a single string
-    "Dept": ["X"]
-}
-# === Step 4: Process Each Sheet & Merge Data ===
-final_data = []
-for sheet_name in all_sheets:
-    df = pd.read_excel(xls, sheet_name=sheet_name, engine="openpyxl", dtype=str)  # Read as string for safe processing
-    # === Fetch Value from (8, V) ===
-    value_from_8V = df.iloc[6, column_index_from_string("V") - 1]  # Row 8 (Index 7), Column V
-    # === Identify Header Row (Where Column F == "Shift") ===
-    col_f = df.iloc[:, column_index_from_string("F") - 1].astype(str).str.strip()
-    header_row_idx = col_f[col_f.str.contains(r"^\s*Shift\s*$", case=False, na=False)].index[0]
-    # Extract headers & process them
-    df.columns = df.iloc[header_row_idx].ffill().tolist()
-    df = df.iloc[header_row_idx + 1:].reset_index(drop=True)  # Remove rows above headers
-    # === Identify End Row (Where Column B Starts with "Da") ===
-    col_b = df.iloc[:, column_index_from_string("B") - 1].astype(str).str.strip()
-    end_row_idx = col_b[col_b.str.startswith("Da", na=False)].index[0]
-    df = df.iloc[:end_row_idx]  # Trim to required rows
-    # === Extract Required Columns ===
-    temp_df = pd.DataFrame()
-    for final_col, excel_cols in column_mapping.items():
-        col_indexes = [column_index_from_string(col) - 1 for col in excel_cols]  # Convert letters to indexes
-        temp_df[final_col] = df.iloc[:, col_indexes].apply(lambda row: ' '.join(row.dropna().astype(str)), axis=1)
-    # === Add Fetched Column & Date Column ===
-    temp_df.insert(0, "Date", value_from_8V)  # Add fetched column
-    # === Fill Down "MC" Column Until a New Value Appears ===
-    temp_df["MC"] = temp_df["MC"].replace("", pd.NA).ffill()
-    # === Fill Down "Job_Name" Based on MC ===
-    job_name_mapping = {}
-    for index, row in temp_df.iterrows():
-        mc_value = row['MC']
-        job_name_value = row['Job_Name']
-        if pd.notna(job_name_value) and job_name_value != "NaN" and job_name_value != "":
-            job_name_mapping[mc_value] = job_name_value
-        elif mc_value in job_name_mapping:
-            temp_df.at[index, 'Job_Name'] = job_name_mapping[mc_value]
-    # === Multiply IC_Percent and IM_Percent by 100 ===
-    for col in ["IC_Percent", "IM_Percent"]:
-        temp_df[col] = pd.to_numeric(temp_df[col], errors="coerce") * 100
-        temp_df[col] = temp_df[col].apply(lambda x: round(x, 2) if pd.notna(x) else pd.NA)
-    # === Remove Excess Spaces, Line Breaks & Ensure Single Column Data ===
-    for col in ["Stopages", "Defects_and_actions"]:
-        temp_df[col] = temp_df[col].astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()  # Remove extra spaces
-    # === Append Data to Final List ===
-    final_data.append(temp_df)
-# === Step 5: Merge All DataFrames & Export to CSV ===
-final_df = pd.concat(final_data, ignore_index=True)
-# === Remove Rows Where "Shift" is Blank or NaN ===
-final_df = final_df[final_df["Shift"].astype(str).str.strip() != ""]  # Removes rows where Shift is empty
-# === Step 6: Change Date format ===
-final_df['Date'] = pd.to_datetime(final_df['Date'], format="%d.%m.%Y").dt.strftime("%Y.%m.%d") # Changed format to "%d.%m.%Y"
-# Convert IC_Percent and IM_Percent to float and handle NaN
-final_df["IC_Percent"] = final_df["IC_Percent"].astype(float)
-final_df["IM_Percent"] = final_df["IM_Percent"].astype(float)
+# Excel columns merged into each jg_containers_defects column (schema.CONTAINERS_DEFECTS), e.g.
+# Job_Name <- C..E, Defects_and_actions <- I..M, Stopages <- N..W
+column_mapping = {col.name: list(col.source) for col in CONTAINERS_DEFECTS.columns if isinstance(col.source, tuple)}
+def join_non_empty(block: pd.DataFrame) -> pd.Series:
+    """Join each row's non-empty cells (text) with a space ("" when all are empty), all columns at once."""
+    values = block.to_numpy(dtype=object)
+    present = ~pd.isna(values)
+    # A cell after an earlier non-empty cell of its row gets the separator in front
+    after_text = np.zeros_like(present)
+    after_text[:, 1:] = np.logical_or.accumulate(present, axis=1)[:, :-1]
+    pieces = np.where(present, values, "")
+    pieces[present & after_text] = " " + pieces[present & after_text]
+    return pd.Series(pieces.sum(axis=1), index=block.index, dtype=object)
+def fill_job_names(mc: pd.Series, job_names: pd.Series) -> pd.Series:
+    """
+    Fill blank Job_Name cells ("", "NaN" or missing) with the last Job_Name seen for the same MC.
+    Rows before the first MC (MC missing) form one group of their own; blanks with no earlier
+    Job_Name for their MC are left as they are.
+    """
+    known = job_names.mask(job_names.isna() | job_names.isin(["", "NaN"]))
+    return known.groupby(mc, dropna=False).ffill().fillna(job_names)
+def extract_defects_sheet(workbook: WorkbookCache, sheet_name: str) -> pd.DataFrame:
+    # Read as string for safe processing
+    df = workbook.str_grid(sheet_name)
+    layout = workbook.layout(sheet_name)
+    with instrument.stage("clean_filter", sheet_name, rows_in=len(df)) as record:
+        # === Fetch Value from (8, V) ===
+        value_from_8V = df.iloc[layout.date_row - 1, column_index_from_string("V") - 1]  # Row 8 in the standard template
+        # === Header Row (Where Column F == "Shift") and End Row (Where Column B Starts with "Da") ===
+        if layout.shift_row is None or layout.end_row is None:
+            raise ValueError(f"Sheet '{sheet_name}' has no defects block (\"Shift\" header in F and \"Da...\" row in B)")
+        # Extract headers & process them
+        df.columns = df.iloc[layout.shift_row - 1].ffill().tolist()
+        df = df.iloc[layout.shift_row:layout.end_row - 1].reset_index(drop=True)  # Keep the rows between them
+        record["rows_out"] = len(df)
+    with instrument.stage("merge_columns", sheet_name, rows_in=len(df)) as record:
+        # === Extract Required Columns ===
+        temp_df = pd.DataFrame({
+            final_col: join_non_empty(df.iloc[:, [column_index_from_string(col) - 1 for col in excel_cols]])  # Letters to indexes
+            for final_col, excel_cols in column_mapping.items()
+        }, index=df.index)
+        # === Add Fetched Column & Date Column ===
+        temp_df.insert(0, "Date", value_from_8V)  # Add fetched column
+        # === Fill Down "MC" Column Until a New Value Appears ===
+        temp_df["MC"] = temp_df["MC"].replace("", pd.NA).ffill()
+        # === Fill Down "Job_Name" Based on MC ===
+        temp_df["Job_Name"] = fill_job_names(temp_df["MC"], temp_df["Job_Name"])
+        # === Remove Excess Spaces, Line Breaks & Ensure Single Column Data ===
+        for col in ["Stopages", "Defects_and_actions"]:
+            temp_df[col] = temp_df[col].astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()  # Remove extra spaces
+        record["rows_out"] = len(temp_df)
+    return temp_df
+def finalize_defects(final_data: List[pd.DataFrame]) -> pd.DataFrame:
+    with instrument.stage("combine", rows_in=sum(len(df) for df in final_data)) as record:
+        # === Step 5: Merge All DataFrames & Export to CSV ===
+        final_df = pd.concat(final_data, ignore_index=True)
+        # === Remove Rows Where "Shift" is Blank or NaN ===
+        final_df = final_df[final_df["Shift"].astype(str).str.strip() != ""]  # Removes rows where Shift is empty
+        # === Step 6: Convert to the column types: Date as "%Y.%m.%d", IC/IM_Percent x100 as float ===
+        final_df = apply_schema(final_df, CONTAINERS_DEFECTS)
 
-# Replace NaN with None for Supabase compatibility
-final_df = final_df.where(pd.notna(final_df), None)
+        # Replace NaN with None for Supabase compatibility
+        final_df = final_df.where(pd.notna(final_df), None)
+        record["rows_out"] = len(final_df)
+    return final_df
+def extract_defects(workbook: WorkbookCache, compact: bool = False) -> pd.DataFrame:
+    # compact=True returns the compact analysis form (see schema.compact_frame) instead of upload-ready rows
+    workbook.add_regions(DEFECTS_REGIONS)
+    # === Step 4: Process Each Sheet & Merge Data ===
+    final_data = []
+    for sheet_name in workbook.sheet_names:
+        # === Append Data to Final List ===
+        final_data.append(extract_defects_sheet(workbook, sheet_name))
+    final_df = finalize_defects(final_data)
+    return compact_table(final_df, CONTAINERS_DEFECTS) if compact else final_df
+def sheet_defect_records(workbook: WorkbookCache, sheet_name: str) -> List[Dict]:
+    """One sheet's defects rows, normalized like extract_defects, as upload-ready records."""
+    return finalize_defects([extract_defects_sheet(workbook, sheet_name)]).to_dict(orient="records")
 
-# # === Step 6: Save to CSV Without Stretching Rows ===
-# csv_output_path = "/content/F2_Monthly_Report.csv"
-# final_df.to_csv(csv_output_path, index=False, quoting=1)  # quoting=1 ensures fields with commas stay intact
-# # === Step 7: Display & Confirm Output ===
-from IPython.display import display
-display(final_df)  # Show final table in Jupyter/Colab
-# print(f"CSV file saved at: {csv_output_path}")
+if __name__ == "__main__":
+    from main import supabase  # Import the Supabase client from main.py
+    from writer import BatchWriter
+    with WorkbookCache(file_path, DEFECTS_REGIONS) as workbook:
+        final_df = extract_defects(workbook)
 
+    # # === Step 6: Save to CSV Without Stretching Rows ===
+    # csv_output_path = "/content/F2_Monthly_Report.csv"
+    # final_df.to_csv(csv_output_path, index=False, quoting=1)  # quoting=1 ensures fields with commas stay intact
+    # # === Step 7: Display & Confirm Output ===
+    from IPython.display import display
+    display(final_df)  # Show final table in Jupyter/Colab
+    # print(f"CSV file saved at: {csv_output_path}")
 
-# === Convert DataFrame to List of Dictionaries ===
-data_to_insert = final_df.to_dict(orient="records")  
 
-# === Insert Data into Supabase ===
-response = supabase.table("jg_containers_defects").insert(data_to_insert).execute()
\ No newline at end of file
+    # === Convert DataFrame to List of Dictionaries ===
+    data_to_insert = final_df.to_dict(orient="records")
+
+    # === Insert Data into Supabase ===
+    BatchWriter(supabase).write(CONTAINERS_DEFECTS.name, data_to_insert)
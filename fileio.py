@@ -0,0 +1,24 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator
+from pandas.io.parquet import get_engine
+
+
+def require_parquet() -> None:
+    """Fail early if neither pyarrow nor fastparquet is installed."""
+    get_engine("auto")
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    Yield a temporary path to write the new content of path to. It replaces path once the block
+    succeeds and is removed if it fails, so readers never see a half-written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,168 @@
+import datetime
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+from fileio import atomic_path, require_parquet
+
+# Environment variable that enables the cache for every WorkbookCache (scripts and worker processes)
+CACHE_DIR_ENV = "JG_GRID_CACHE_DIR"
+CACHE_SIZE_ENV = "JG_GRID_CACHE_MB"
+
+
+def _encode_cell(value: object):
+    """Return (kind, text) for a raw cell so it can be rebuilt with the same Python type."""
+    if isinstance(value, bool):
+        return "b", str(int(value))
+    if isinstance(value, (int, np.integer)):
+        return "i", str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return "f", repr(float(value))
+    if isinstance(value, datetime.datetime):
+        return "dt", value.isoformat()
+    if isinstance(value, datetime.date):
+        return "d", value.isoformat()
+    if isinstance(value, datetime.time):
+        return "t", value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return "td", repr(value.total_seconds())
+    return "s", str(value)
+
+
+_DECODERS = {
+    "b": lambda text: bool(int(text)),
+    "i": int,
+    "f": float,
+    "dt": datetime.datetime.fromisoformat,
+    "d": datetime.date.fromisoformat,
+    "t": datetime.time.fromisoformat,
+    "td": lambda text: datetime.timedelta(seconds=float(text)),
+    "s": str,
+}
+
+
+def grid_to_cells(grid: pd.DataFrame) -> pd.DataFrame:
+    """Flatten a raw grid into one row per non-empty cell, plus a "shape" record."""
+    values = grid.to_numpy()
+    rows, cols = np.nonzero(pd.notna(grid).to_numpy())
+    encoded = [_encode_cell(values[r, c]) for r, c in zip(rows, cols)]
+    return pd.DataFrame({
+        "row": np.append(rows, grid.shape[0]).astype("int32"),
+        "col": np.append(cols, grid.shape[1]).astype("int32"),
+        "kind": [kind for kind, _ in encoded] + ["shape"],
+        "value": [text for _, text in encoded] + [""],
+    })
+
+
+def cells_to_grid(cells: pd.DataFrame) -> pd.DataFrame:
+    """Rebuild the raw grid written by grid_to_cells."""
+    is_shape = cells["kind"] == "shape"
+    n_rows, n_cols = (int(n) for n in cells.loc[is_shape, ["row", "col"]].iloc[0])
+    values = np.full((n_rows, n_cols), np.nan, dtype=object)
+    for kind, group in cells.loc[~is_shape].groupby("kind"):
+        decoded = group["value"] if kind == "s" else group["value"].map(_DECODERS[kind])
+        values[group["row"].to_numpy(), group["col"].to_numpy()] = decoded.to_numpy(dtype=object)
+    return pd.DataFrame(values)
+
+
+class GridCache:
+    """On-disk Parquet cache of decoded sheet grids, keyed by workbook fingerprint, with LRU eviction."""
+    def __init__(self, directory: str, max_bytes: int = 1 << 30):
+        """
+        Initialize the cache directory.
+        Args:
+            directory (str): Where the Parquet files are kept
+            max_bytes (int): Size bound; least recently used entries are evicted beyond it
+        """
+        require_parquet()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["GridCache"]:
+        """Return the cache configured through JG_GRID_CACHE_DIR (and JG_GRID_CACHE_MB), if any."""
+        directory = os.environ.get(CACHE_DIR_ENV)
+        if not directory:
+            return None
+        return cls(directory, int(float(os.environ.get(CACHE_SIZE_ENV, 1024)) * (1 << 20)))
+
+    @staticmethod
+    def fingerprint(file_path: str, regions_key: str) -> str:
+        """Identify a workbook version: path + size + mtime, and the regions the grids cover."""
+        stat = os.stat(file_path)
+        raw = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{regions_key}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _path(self, fingerprint: str, name: str) -> str:
+        digest = hashlib.sha1(f"{fingerprint}|{name}".encode()).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def _touch(self, path: str) -> None:
+        try:
+            os.utime(path)  # mtime doubles as last-used time for LRU eviction
+        except FileNotFoundError:
+            pass
+
+    def get_sheet_names(self, fingerprint: str) -> Optional[List[str]]:
+        """Return the cached sheet names of a workbook, or None on a miss."""
+        path = self._path(fingerprint, "") + ".json"
+        try:
+            with open(path, encoding="utf-8") as f:
+                sheet_names = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._touch(path)
+        return sheet_names
+
+    def put_sheet_names(self, fingerprint: str, sheet_names: List[str]) -> None:
+        """Store the sheet names of a workbook."""
+        path = self._path(fingerprint, "") + ".json"
+        with atomic_path(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(sheet_names, f)
+
+    def get(self, fingerprint: str, sheet_name: str) -> Optional[pd.DataFrame]:
+        """Return a cached grid, or None on a miss (a truncated or corrupt entry is deleted and counts as one)."""
+        path = self._path(fingerprint, sheet_name) + ".parquet"
+        try:
+            grid = cells_to_grid(pd.read_parquet(path))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, IndexError) as e:  # pyarrow's ArrowInvalid is a ValueError
+            print(f":warning: Dropping unreadable grid cache entry for sheet '{sheet_name}' ({e})")
+            self._remove(path)
+            return None
+        self._touch(path)
+        return grid
+
+    def put(self, fingerprint: str, sheet_name: str, grid: pd.DataFrame) -> None:
+        """Store a grid (call evict once the workbook is done)."""
+        path = self._path(fingerprint, sheet_name) + ".parquet"
+        with atomic_path(path) as tmp_path:
+            grid_to_cells(grid).to_parquet(tmp_path, index=False)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith((".parquet", ".json")):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
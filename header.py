@@ -1,143 +1,153 @@
-from main import supabase  # Import the Supabase client from main.py
 import pandas as pd
 import re
 from openpyxl.utils import column_index_from_string
+from workbook import Region, WorkbookCache
+from schema import FURNACE_DATA, apply_schema, compact_table
+import instrument
 # from tabulate import tabulate
 # === Step 1: Upload File in Google Colab ===
 # from google.colab import files
 # uploaded = files.upload()  # Manually upload .xlsx file
 # Get the uploaded filename
 file_path = r"E:\proj1\F1 PROD REPORT JAN 2025.xlsx"
-furnace_identifier = re.search(r"F\d+", file_path).group(0) if re.search(r"F\d+", file_path) else None
+def get_furnace_identifier(file_path):
+    match = re.search(r"F\d+", file_path)
+    return match.group(0) if match else None
 # === Step 2: Read All Sheets ===
-xls = pd.ExcelFile(file_path)  # Load the workbook
-sheet_names = xls.sheet_names  # Get all sheet names
+# Sheets are decoded once by WorkbookCache; the grid has no header row, so
+# grid row index = Excel row - 1. Only these cells are read from each sheet
+# (rows 8, 10-13, 15 and the "Total" row in the standard template; the exact
+# rows come from WorkbookCache.layout, so a sheet shifted by a row still works):
+HEADER_REGIONS = [
+    Region("date", min_row=1, max_row=14, min_col="V", max_col="V"),
+    Region("summary", min_row=10, max_row=13, min_col="B", max_col="S"),
+    Region("glass_density", min_row=13, max_row=13, min_col="V", max_col="V"),
+    Region("table2_headers", min_row=15, max_row=15, min_col="K", max_col="W"),
+    Region("total", min_row=16, min_col="B", max_col="W", stop_cols=("B", "C"), stop_pattern=r"^\s*Total\s*$"),
+]
 # === Step 3: Function to Extract & Format Data from Each Sheet ===
-def fetch_and_stack_single_table(df, start_row, end_row, col_pairs, sheet_name):
+def fetch_and_stack_single_table(df, start_row, end_row, col_pairs, sheet_name, date_row=7):
     stacked_data = []
     date_col_idx = column_index_from_string("V") - 1  # Extract Date from row 8, column V
     try:
-        date_value = df.iloc[6, date_col_idx]  # Row 8 (0-indexed = 7)
+        date_value = df.iloc[date_row, date_col_idx]  # Row 8 (0-indexed = 7) in the standard template
     except Exception:
         print(f":warning: Warning: Could not extract date from sheet '{sheet_name}'. Using 'Unknown'.")
         date_value = "Unknown"
     for col1, col2 in col_pairs:
         col1_idx, col2_idx = column_index_from_string(col1) - 1, column_index_from_string(col2) - 1
-        subset = df.iloc[start_row-1:end_row, [col1_idx, col2_idx]].copy()
+        subset = df.iloc[start_row:end_row + 1, [col1_idx, col2_idx]].copy()
         subset.columns = ["Description", "Values"]
         subset["Description"] = subset["Description"].astype(str).str.rstrip(":")
         for row in subset.itertuples(index=False):
             stacked_data.append([date_value, row.Description, row.Values])  # Add Date column
     return stacked_data
-# === Step 4: Process All Sheets & Combine into One Table ===
-all_data = []
-column_pairs = [("B", "F"), ("K", "M"), ("P", "S")]  # Columns to extract
-start_row, end_row = 9, 12  # Rows to extract
-for sheet in sheet_names:
-    try:
-        df = pd.read_excel(file_path, sheet_name=sheet, engine="openpyxl")
-        df.columns = df.columns.astype(str).str.strip()
-        extracted_data = fetch_and_stack_single_table(df, start_row, end_row, column_pairs, sheet)
-        all_data.extend(extracted_data)
-    except Exception as e:
-        print(f":warning: Skipping sheet '{sheet}' due to error: {e}")
-# Convert to DataFrame & Pivot
-final_table1 = pd.DataFrame(all_data, columns=["Date", "Description", "Values"])
-final_table1 = final_table1.pivot_table(index="Date", columns="Description", values="Values", aggfunc="first").reset_index()
 # Clean Column Names
 def clean_column_name(name):
     name = re.sub(r"[^\w\s]", "", name)  # Remove special characters
     return re.sub(r"\s+", "_", name.strip())  # Replace spaces with underscores
-final_table1.columns = [clean_column_name(col) for col in final_table1.columns]
-# Rename last column dynamically
-columns = list(final_table1.columns)
-columns[-1] = "YTD_Pack_Percent"
-final_table1.columns = columns
-# Debug: Print row count
-print(f":white_check_mark: Processed {final_table1.shape[0]} rows in Table 1")
-# === Step 5: Extract Data for Table 2 ===
+# Table 2 columns, read from the header row (Excel row 15) and the "Total" row
 target_columns = ["K", "M", "N", "O", "Q", "S", "V", "W"]
 target_indices = [column_index_from_string(col) - 1 for col in target_columns]
-combined_data = []
-for sheet_name in xls.sheet_names:
-    df = pd.read_excel(xls, sheet_name=sheet_name, engine="openpyxl")
-    df.columns = df.columns.astype(str).str.strip()
-    valid_row = None
-    for row in range(22, 45):
-        if str(df.iloc[row, column_index_from_string("B") - 1]).strip() == "Total":
-            valid_row = row
-            break
-    if valid_row is not None:
-        headers = [clean_column_name(str(col)) for col in df.iloc[13, target_indices].values]
-        headers = [col.replace("Mc_Gob_cut_Output_Furnace_glass_Pull_Ton", "MC_gob_cut_output") for col in headers]
-        values = df.iloc[valid_row, target_indices].values.tolist()
-        combined_data.append(values)
-# Convert to DataFrame
-final_table2 = pd.DataFrame(combined_data, columns=headers)
-# Debug: Print row count
-print(f":white_check_mark: Processed {final_table2.shape[0]} rows in Table 2")
-# === Step 6: Ensure Data Consistency Before Merging ===
-# Convert all column names to lowercase for uniformity
-final_table1.columns = final_table1.columns.str.lower()
-final_table2.columns = final_table2.columns.str.lower()
-# Ensure 'Date' column exists in final_table2 (use index if missing)
-if "date" not in final_table2.columns:
-    final_table2.insert(0, "date", final_table1["date"])
-# Ensure same row order
-final_table2 = final_table2.sort_values("date").reset_index(drop=True)
-final_table1 = final_table1.sort_values("date").reset_index(drop=True)
-# === Step 6.1: Extract 'Actual_Glass_Density' from (13, V) ===
-actual_glass_density_values = []
-for sheet_name in xls.sheet_names:
-    df = pd.read_excel(xls, sheet_name=sheet_name, engine="openpyxl")
-    df.columns = df.columns.astype(str).str.strip()
-    # Extract value from (13, V), ensuring it's numeric
-    value = df.iloc[11, column_index_from_string("V") - 1]  # Row 13 (0-indexed = 12)
+# jg_furnace_data name of each (lowercased) label, from the sources in schema.FURNACE_DATA
+FURNACE_COLUMNS = {col.source.lower(): col.name for col in FURNACE_DATA.columns if col.source}
+def extract_furnace_sheet(workbook: WorkbookCache, sheet: str) -> dict:
+    """Collect one sheet's Table 1 rows, Table 2 "Total" row and glass density."""
+    df = workbook.grid(sheet)
+    layout = workbook.layout(sheet)
+    parts = {"table1": [], "table2_headers": None, "table2_values": None, "density": None}
+    # === Step 4: Table 1 rows ===
+    column_pairs = [("B", "F"), ("K", "M"), ("P", "S")]  # Columns to extract
+    first_row, last_row = layout.summary_rows  # Excel rows 10-13 in the standard template
     try:
-        numeric_value = float(re.findall(r"\d+\.\d+|\d+", str(value))[0])  # Extract first numeric value
+        parts["table1"] = fetch_and_stack_single_table(df, first_row - 1, last_row - 1, column_pairs, sheet, layout.date_row - 1)
+    except Exception as e:
+        print(f":warning: Skipping sheet '{sheet}' due to error: {e}")
+    # === Step 5: Table 2 "Total" row ===
+    if layout.total_row is not None:
+        parts["table2_headers"] = [clean_column_name(str(col)) for col in df.iloc[layout.header_row - 1, target_indices].values]  # Excel row 15
+        parts["table2_values"] = df.iloc[layout.total_row - 1, target_indices].values.tolist()
+    # === Step 6.1: 'Actual_Glass_Density' from (13, V), ensuring it's numeric ===
+    value = df.iloc[layout.density_row - 1, column_index_from_string("V") - 1]  # Row 13 in the standard template
+    try:
+        parts["density"] = float(re.findall(r"\d+\.\d+|\d+", str(value))[0])  # Extract first numeric value
     except (IndexError, ValueError):
-        numeric_value = None  # Assign None if no numeric value is found
-    actual_glass_density_values.append(numeric_value)
-# Add extracted values to final_table2
-final_table2["actual_glass_density"] = actual_glass_density_values
-# Add extracted values to final_table2
-final_table2["actual_glass_density"] = actual_glass_density_values
-# Convert all columns to string for consistency
-final_table1 = final_table1.astype(str)
-final_table2 = final_table2.astype(str)
-# === Step 7: Merge Tables ===
-merged_table = pd.merge(final_table1, final_table2, on="date", how="outer")
-merged_table.columns = merged_table.columns.str.lower()
-# Convert all column names to lowercase for uniformity
-merged_table.columns = merged_table.columns.str.lower()
-
-# Rename columns
-merged_table = merged_table.rename(columns={
-    "mc_down_time_jchange_glass_draining_cullet": "mc_dt_or_cgd",
-    "daily_pack": "daily_pack_percent",
-    "monthly_ton": "monthly_ton_percent",
-})
-
-# Multiply specific columns by 100
-for col in ["net", "act_pack_eff", "ytd_pack_percent"]:
-    merged_table[col] = pd.to_numeric(merged_table[col], errors="coerce") * 100
-    merged_table[col] = merged_table[col].apply(lambda x: round(x, 2) if pd.notna(x) else pd.NA)
-
-# Get a list of columns to round (excluding 'date' and 'std_glass_density')
-columns_to_round = [col for col in merged_table.columns if col not in ["date", "std_glass_density"]]
+        parts["density"] = None  # Assign None if no numeric value is found
+    return parts
+def extract_furnace_data(workbook: WorkbookCache, furnace_identifier=None, compact: bool = False) -> pd.DataFrame:
+    # compact=True returns the compact analysis form (see schema.compact_frame) instead of upload-ready rows
+    workbook.add_regions(HEADER_REGIONS)
+    sheet_parts = [extract_furnace_sheet(workbook, sheet) for sheet in workbook.sheet_names]
+    merged_table = build_furnace_table(sheet_parts, furnace_identifier)
+    return compact_table(merged_table, FURNACE_DATA) if compact else merged_table
+def build_furnace_table(sheet_parts: list, furnace_identifier=None) -> pd.DataFrame:
+    """Pivot, merge and convert the per-sheet parts from extract_furnace_sheet into the jg_furnace_data table."""
+    # === Step 4: Combine Table 1 rows of all sheets ===
+    all_data = [row for parts in sheet_parts for row in parts["table1"]]
+    # Convert to DataFrame & Pivot
+    final_table1 = pd.DataFrame(all_data, columns=["Date", "Description", "Values"])
+    with instrument.stage("pivot_merge", rows_in=len(final_table1)) as record:
+        # dropna=False keeps a labelled column whose values are all blank (the last one is renamed below)
+        final_table1 = final_table1.pivot_table(index="Date", columns="Description", values="Values",
+                                                aggfunc="first", dropna=False).reset_index()
+        if "nan" in final_table1 and final_table1["nan"].isna().all():
+            final_table1 = final_table1.drop(columns="nan")  # Unlabelled blank cells
+        record["rows_out"] = len(final_table1)
+    final_table1.columns = [clean_column_name(col) for col in final_table1.columns]
+    # Debug: Print row count
+    print(f":white_check_mark: Processed {final_table1.shape[0]} rows in Table 1")
+    # === Step 5: Combine Table 2 rows of the sheets that have a "Total" row ===
+    combined_data = [parts["table2_values"] for parts in sheet_parts if parts["table2_values"] is not None]
+    headers = None
+    for parts in sheet_parts:
+        if parts["table2_headers"] is not None:
+            headers = parts["table2_headers"]
+    # Convert to DataFrame
+    final_table2 = pd.DataFrame(combined_data, columns=headers)
+    # Debug: Print row count
+    print(f":white_check_mark: Processed {final_table2.shape[0]} rows in Table 2")
+    # === Step 6: Ensure Data Consistency Before Merging ===
+    # Convert all column names to lowercase for uniformity
+    final_table1.columns = final_table1.columns.str.lower()
+    final_table2.columns = final_table2.columns.str.lower()
+    # Ensure 'Date' column exists in final_table2 (use index if missing)
+    if "date" not in final_table2.columns:
+        final_table2.insert(0, "date", final_table1["date"])
+    # Ensure same row order
+    final_table2 = final_table2.sort_values("date").reset_index(drop=True)
+    final_table1 = final_table1.sort_values("date").reset_index(drop=True)
+    # === Step 6.1: 'Actual_Glass_Density' of every sheet ===
+    actual_glass_density_values = [parts["density"] for parts in sheet_parts]
+    # Add extracted values to final_table2
+    final_table2["actual_glass_density"] = actual_glass_density_values
+    # === Step 7: Merge Tables (on the raw date text, before any conversion) ===
+    with instrument.stage("pivot_merge", rows_in=len(final_table1) + len(final_table2)) as record:
+        merged_table = pd.merge(final_table1, final_table2, on="date", how="outer")
+        record["rows_out"] = len(merged_table)
+    # Convert all column names to lowercase for uniformity
+    merged_table.columns = merged_table.columns.str.lower()
 
-# Round the values in the selected columns to 2 decimal places
-merged_table[columns_to_round] = merged_table[columns_to_round].apply(pd.to_numeric, errors='coerce').round(2)
+    # Rename the labelled columns to their jg_furnace_data names
+    merged_table = merged_table.rename(columns=FURNACE_COLUMNS)
 
-if furnace_identifier:
-    # Add new column and populate with furnace identifier
-    merged_table.insert(0, "furnace", furnace_identifier)  # Insert at the beginning (index 0)
-else:
-    print(":warning: Warning: Could not extract furnace identifier from filename. Furnace column will be empty.")
+    if furnace_identifier:
+        # Add new column and populate with furnace identifier
+        merged_table.insert(0, "furnace", furnace_identifier)  # Insert at the beginning (index 0)
+    else:
+        print(":warning: Warning: Could not extract furnace identifier from filename. Furnace column will be empty.")
 
-# Change date format
-merged_table['date'] = pd.to_datetime(merged_table['date'], format="%d.%m.%Y").dt.strftime("%Y-%m-%d")
+    # === Step 8: Convert the raw cells to the jg_furnace_data column types (schema.FURNACE_DATA) ===
+    # Percentages x100, numbers rounded to 2 decimals, std_glass_density kept as text, date as "%Y-%m-%d"
+    with instrument.stage("numeric_conversion", rows_in=len(merged_table)) as record:
+        merged_table = apply_schema(merged_table, FURNACE_DATA)
+        record["rows_out"] = len(merged_table)
+    return merged_table
 
-# Insert data into Supabase
-data_to_insert = merged_table.to_dict(orient="records")
-response = supabase.table("jg_furnace_data").insert(data_to_insert).execute()
\ No newline at end of file
+if __name__ == "__main__":
+    from main import supabase  # Import the Supabase client from main.py
+    from writer import BatchWriter
+    with WorkbookCache(file_path, HEADER_REGIONS) as workbook:
+        merged_table = extract_furnace_data(workbook, get_furnace_identifier(file_path))
+    # Insert data into Supabase
+    data_to_insert = merged_table.to_dict(orient="records")
+    BatchWriter(supabase).write(FURNACE_DATA.name, data_to_insert)
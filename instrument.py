@@ -0,0 +1,137 @@
+import datetime
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Report that stage() records into; None outside of run()
+_active: Optional["RunReport"] = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB (None if it cannot be measured)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KB on Linux and in bytes on macOS
+        return round(peak / (1 << 20) if sys.platform == "darwin" else peak / 1024, 1)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1 << 20), 1)
+    return None
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size of this process, in MB (None if it cannot be measured)."""
+    if psutil is not None:
+        return round(psutil.Process().memory_info().rss / (1 << 20), 1)
+    try:
+        with open("/proc/self/statm") as f:  # Linux without psutil
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1 << 20), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RunReport:
+    """
+    Per-stage wall time, rows in/out and memory for one ingestion run.
+    Each stage records the RSS at its start and end (rss_start_mb / rss_end_mb) and the process
+    high-water mark so far (process_peak_rss_mb), which only grows and so is not per stage.
+    """
+    def __init__(self, name: str, **context):
+        """
+        Args:
+            name (str): What ran (e.g. "pipeline", "header")
+            **context: Extra fields stored in the report (file, furnace, ...)
+        """
+        self.name = name
+        self.context = context
+        self.started_at = datetime.datetime.now().isoformat(timespec="seconds")
+        self.stages: List[Dict[str, object]] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, sheet: Optional[str] = None, rows_in: Optional[int] = None) -> Iterator[Dict[str, object]]:
+        """Time a stage; the caller may set ``record["rows_out"]`` (or other fields) on the yielded record."""
+        record: Dict[str, object] = {"stage": name, "sheet": sheet, "rows_in": rows_in, "rows_out": None,
+                                     "rss_start_mb": rss_mb()}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            record["rss_end_mb"] = rss_mb()
+            if record["rss_start_mb"] is not None and record["rss_end_mb"] is not None:
+                record["rss_delta_mb"] = round(record["rss_end_mb"] - record["rss_start_mb"], 1)
+            record["process_peak_rss_mb"] = peak_rss_mb()
+            self.stages.append(record)
+
+    def summary(self) -> Dict[str, Dict[str, object]]:
+        """Total seconds, call count, rows out and largest RSS growth per stage name."""
+        summary: Dict[str, Dict[str, object]] = {}
+        for record in self.stages:
+            entry = summary.setdefault(record["stage"], {"seconds": 0.0, "count": 0, "rows_out": 0, "max_rss_delta_mb": None})
+            entry["seconds"] = round(entry["seconds"] + record["seconds"], 4)
+            entry["count"] += 1
+            entry["rows_out"] += record["rows_out"] or 0
+            delta = record.get("rss_delta_mb")
+            if delta is not None and (entry["max_rss_delta_mb"] is None or delta > entry["max_rss_delta_mb"]):
+                entry["max_rss_delta_mb"] = delta
+        return summary
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            **self.context,
+            "started_at": self.started_at,
+            "total_seconds": round(time.perf_counter() - self._start, 4),
+            "process_peak_rss_mb": peak_rss_mb(),
+            "summary": self.summary(),
+            "stages": self.stages,
+        }
+
+    def write(self, directory: str) -> str:
+        """Write the report as JSON into directory and return its path."""
+        os.makedirs(directory, exist_ok=True)
+        label = os.path.splitext(os.path.basename(str(self.context.get("file", self.name))))[0]
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(directory, f"{label}.{stamp}.{os.getpid()}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+
+@contextmanager
+def run(name: str, report_dir: Optional[str] = None, **context) -> Iterator[RunReport]:
+    """Collect the stages recorded while the block runs; write the JSON report into report_dir, if given."""
+    global _active
+    previous, _active = _active, RunReport(name, **context)
+    report = _active
+    try:
+        yield report
+    finally:
+        _active = previous
+        if report_dir:
+            path = report.write(report_dir)
+            print(f":bar_chart: Run report written to {path}")
+
+
+@contextmanager
+def stage(name: str, sheet: Optional[str] = None, rows_in: Optional[int] = None) -> Iterator[Dict[str, object]]:
+    """Record a stage into the active run, or just run the block when no run is active."""
+    if _active is None:
+        yield {}
+        return
+    with _active.stage(name, sheet, rows_in) as record:
+        yield record
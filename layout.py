@@ -0,0 +1,173 @@
+import datetime
+import hashlib
+import re
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+# Columns the anchors are looked up in
+DATE_COL = "V"  # Report date, e.g. "01.01.2025"
+MC_COL = "B"  # "Mc" header of the containers table, and the "Da..." row ending the defects block
+TOTAL_COLS = ("B", "C")  # "Total" row closing the containers table
+SHIFT_COL = "F"  # "Shift" header of the defects block
+# Where the old fixed offsets put the anchors (1-based Excel rows); used when an anchor is not found
+DEFAULT_DATE_ROW = 8
+DEFAULT_HEADER_ROW = 15
+
+_DATE = re.compile(r"^\s*\d{1,2}\.\d{1,2}\.\d{4}\s*$")
+_MC = re.compile(r"^\s*Mc\s*$")
+_TOTAL = re.compile(r"^\s*Total\s*$")
+_SHIFT = re.compile(r"(?i)^\s*Shift\s*$")
+_END = re.compile(r"^\s*Da")
+
+
+@dataclass(frozen=True)
+class Layout:
+    """
+    Anchors of one sheet in 1-based Excel rows (None when the sheet has no such row).
+    The summary rows, the glass density and the containers data are at fixed offsets from
+    header_row, so a sheet that shifts by a row is still read correctly.
+    """
+    date_row: int = DEFAULT_DATE_ROW
+    header_row: int = DEFAULT_HEADER_ROW
+    total_row: Optional[int] = None
+    shift_row: Optional[int] = None
+    end_row: Optional[int] = None
+    fingerprint: str = ""
+    header_columns: Tuple[Tuple[str, str], ...] = ()  # (letter, label) of the non-empty header cells
+
+    @property
+    def summary_rows(self) -> Tuple[int, int]:
+        """First and last Excel row of the summary block (rows 10-13 in the standard template)."""
+        return self.header_row - 5, self.header_row - 2
+
+    @property
+    def density_row(self) -> int:
+        """Excel row of the actual glass density in column V (row 13 in the standard template)."""
+        return self.header_row - 2
+
+    def column(self, label: str) -> Optional[str]:
+        """Letter of the containers header cell with this label, if any."""
+        for letter, text in self.header_columns:
+            if text == label:
+                return letter
+        return None
+
+
+def _cell(values, row: Optional[int], col: str) -> object:
+    """Cell (row, col) of a raw grid's values, NaN outside the grid."""
+    r, c = (row or 0) - 1, column_index_from_string(col) - 1
+    if 0 <= r < values.shape[0] and 0 <= c < values.shape[1]:
+        return values[r, c]
+    return float("nan")
+
+
+def _is_date(value: object) -> bool:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return True
+    return isinstance(value, str) and bool(_DATE.match(value))
+
+
+def _matches(pattern, value: object) -> bool:
+    return pd.notna(value) and bool(pattern.search(str(value)))
+
+
+def _row_labels(values, row: Optional[int]) -> Tuple[Tuple[str, str], ...]:
+    if row is None or not 0 < row <= values.shape[0]:
+        return ()
+    return tuple((get_column_letter(c + 1), str(value).strip())
+                 for c, value in enumerate(values[row - 1]) if pd.notna(value) and str(value).strip())
+
+
+def _fingerprint(header_columns, shift_columns) -> str:
+    """Template identity: the labels of the containers header row and of the defects header row."""
+    return hashlib.sha1(repr((header_columns, shift_columns)).encode()).hexdigest()[:16]
+
+
+def scan_layout(grid: pd.DataFrame) -> Layout:
+    """
+    Find every anchor of a raw sheet grid (``grid.iloc[r - 1, c - 1]`` is Excel cell (r, c)) in one pass.
+    Returns:
+        Layout: Anchors and template fingerprint; missing date/header anchors keep the old fixed rows
+    """
+    values = grid.to_numpy()
+    found: Dict[str, int] = {}
+    for row in range(1, values.shape[0] + 1):
+        if "header" not in found:
+            if "date" not in found and _is_date(_cell(values, row, DATE_COL)):
+                found["date"] = row
+            if _matches(_MC, _cell(values, row, MC_COL)):
+                found["header"] = row
+        elif "total" not in found and any(_matches(_TOTAL, _cell(values, row, col)) for col in TOTAL_COLS):
+            found["total"] = row
+        if "shift" not in found:
+            if _matches(_SHIFT, _cell(values, row, SHIFT_COL)):
+                found["shift"] = row
+        elif "end" not in found and _matches(_END, _cell(values, row, MC_COL)):
+            found["end"] = row
+            break  # The defects block is the last thing the extractors read
+    header_row = found.get("header", DEFAULT_HEADER_ROW)
+    header_columns = _row_labels(values, header_row)
+    return Layout(
+        date_row=found.get("date", DEFAULT_DATE_ROW),
+        header_row=header_row,
+        total_row=found.get("total"),
+        shift_row=found.get("shift"),
+        end_row=found.get("end"),
+        fingerprint=_fingerprint(header_columns, _row_labels(values, found.get("shift"))),
+        header_columns=header_columns,
+    )
+
+
+# Checks a cached layout must pass on a new sheet before it is reused
+_CHECKS: List[Tuple[str, Callable[[object], bool], Tuple[str, ...]]] = [
+    ("date_row", _is_date, (DATE_COL,)),
+    ("header_row", lambda value: _matches(_MC, value), (MC_COL,)),
+    ("total_row", lambda value: _matches(_TOTAL, value), TOTAL_COLS),
+    ("shift_row", lambda value: _matches(_SHIFT, value), (SHIFT_COL,)),
+    ("end_row", lambda value: _matches(_END, value), (MC_COL,)),
+]
+
+
+def verify_layout(grid: pd.DataFrame, layout: Layout) -> bool:
+    """Cheap check that a layout found on another sheet fits this one: every anchor cell and the template fingerprint match."""
+    values = grid.to_numpy()
+    for attr, check, cols in _CHECKS:
+        row = getattr(layout, attr)
+        if row is None or not any(check(_cell(values, row, col)) for col in cols):
+            return False
+    header_columns = _row_labels(values, layout.header_row)
+    return _fingerprint(header_columns, _row_labels(values, layout.shift_row)) == layout.fingerprint
+
+
+class LayoutIndex:
+    """Layouts of the templates seen so far, most recently used first, reused after verify_layout."""
+    def __init__(self, max_templates: int = 8):
+        """
+        Args:
+            max_templates (int): Layouts kept; a workbook normally has one or two templates
+        """
+        self.max_templates = max_templates
+        self.templates: "OrderedDict[Layout, None]" = OrderedDict()
+        self.hits = 0
+        self.scans = 0
+
+    def detect(self, grid: pd.DataFrame) -> Tuple[Layout, bool]:
+        """
+        Return the sheet's layout and whether a cached one was reused.
+        Only layouts with every anchor present are cached, since a missing anchor cannot be verified.
+        """
+        for layout in reversed(self.templates):
+            if verify_layout(grid, layout):
+                self.templates.move_to_end(layout)
+                self.hits += 1
+                return layout, True
+        layout = scan_layout(grid)
+        self.scans += 1
+        if all(getattr(layout, attr) is not None for attr, _, _ in _CHECKS):
+            self.templates[layout] = None
+            while len(self.templates) > self.max_templates:
+                self.templates.popitem(last=False)
+        return layout, False
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from typing import Dict, List, Optional
+from fileio import atomic_path
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 of a workbook's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def grid_hash(grid: pd.DataFrame) -> str:
+    """SHA-256 of a decoded sheet grid (the cells the extractors read)."""
+    digest = hashlib.sha256(str(grid.shape).encode())
+    digest.update(pd.util.hash_pandas_object(grid.astype(str), index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """Local JSON record of ingested workbooks: a content hash per workbook and per sheet."""
+    def __init__(self, path: str = "ingest_manifest.json"):
+        """
+        Load the manifest, starting empty if the file does not exist yet.
+        Args:
+            path (str): Location of the manifest JSON file
+        """
+        self.path = path
+        self.entries: Dict[str, Dict[str, object]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def entry(self, file_path: str) -> Optional[Dict[str, object]]:
+        """Return the recorded {"hash", "sheets", "days"} entry of a workbook, if any."""
+        return self.entries.get(self._key(file_path))
+
+    def record(self, file_path: str, workbook_hash: str, sheet_hashes: Dict[str, str],
+               day_hashes: Optional[Dict[str, str]] = None) -> None:
+        """Record the hashes of a workbook whose changed sheets (and report days, by V8 date) were ingested successfully."""
+        entry = self.entries.setdefault(self._key(file_path), {"hash": None, "sheets": {}})
+        entry["hash"] = workbook_hash
+        entry["sheets"].update(sheet_hashes)
+        if day_hashes:
+            entry.setdefault("days", {}).update(day_hashes)
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        with atomic_path(self.path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+
+def changed_sheets(entry: Optional[Dict[str, object]], sheet_hashes: Dict[str, str]) -> List[str]:
+    """Sheets whose hash differs from (or is missing in) a manifest entry, in workbook order."""
+    known = entry["sheets"] if entry else {}
+    return [sheet for sheet, digest in sheet_hashes.items() if known.get(sheet) != digest]
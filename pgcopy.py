@@ -0,0 +1,107 @@
+import csv
+import io
+import os
+from typing import Dict, List, Optional, Sequence
+from config import DB_CONFIG
+from writer import BatchWriter
+
+try:
+    import psycopg2
+    from psycopg2 import sql
+    from psycopg2.pool import ThreadedConnectionPool
+except ImportError:
+    psycopg2 = None
+
+# Environment variable with the PostgreSQL DSN (read by every worker process); config.DB_CONFIG otherwise
+PG_DSN_ENV = "JG_PG_DSN"
+# Written for None so that empty strings stay empty strings
+NULL = r"\N"
+
+
+def connect_pool(dsn: Optional[str] = None, maxconn: int = 4) -> "ThreadedConnectionPool":
+    """
+    Open a small thread-safe connection pool.
+    Args:
+        dsn (str, optional): libpq connection string; defaults to JG_PG_DSN, then config.DB_CONFIG
+        maxconn (int): Most connections held open at once
+    Returns:
+        ThreadedConnectionPool: Pool shared by the CopyWriter's sender threads
+    """
+    if psycopg2 is None:
+        raise ImportError("The COPY loader needs psycopg2 (pip install psycopg2-binary)")
+    dsn = dsn or os.environ.get(PG_DSN_ENV)
+    if dsn:
+        return ThreadedConnectionPool(1, maxconn, dsn)
+    return ThreadedConnectionPool(1, maxconn, **DB_CONFIG)
+
+
+def _csv_value(value: object) -> object:
+    return NULL if value is None else value
+
+
+def records_to_csv(records: List[Dict], columns: Sequence[str]) -> io.StringIO:
+    """Render records as CSV for COPY, with None written as NULL."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for record in records:
+        writer.writerow([_csv_value(record.get(col)) for col in columns])
+    buffer.seek(0)
+    return buffer
+
+
+class CopyWriter(BatchWriter):
+    """
+    Load records with COPY FROM STDIN through a connection pool instead of the REST API.
+    Each chunk is copied into a temporary staging table and merged into the target with
+    INSERT ... ON CONFLICT on NATURAL_KEYS, in one transaction per chunk.
+    """
+    def __init__(self, pool, chunk_size: int = 5000, max_concurrency: int = 4,
+                 max_retries: int = 3, backoff: float = 1.0):
+        """
+        Initialize the writer.
+        Args:
+            pool: psycopg2 connection pool (see connect_pool); at least max_concurrency connections
+            chunk_size (int): Records per COPY
+            max_concurrency (int): Chunks loaded at once, each on its own connection
+            max_retries (int): Retries per chunk after the first attempt
+            backoff (float): Initial retry delay in seconds, doubled on every retry
+        """
+        super().__init__(pool, chunk_size, max_concurrency, max_retries, backoff)
+
+    def _merge_sql(self, table: str, columns: Sequence[str], key: Optional[Sequence[str]]):
+        target = sql.Identifier(table)
+        cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+        query = sql.SQL("INSERT INTO {} ({}) SELECT {} FROM _jg_stage").format(target, cols, cols)
+        if not key:
+            return query
+        updates = [col for col in columns if col not in key]
+        if updates:
+            action = sql.SQL("DO UPDATE SET {}").format(sql.SQL(", ").join(
+                sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(col), sql.Identifier(col)) for col in updates))
+        else:
+            action = sql.SQL("DO NOTHING")
+        return sql.SQL("{} ON CONFLICT ({}) {}").format(query, sql.SQL(", ").join(map(sql.Identifier, key)), action)
+
+    def _send_once(self, table: str, chunk: List[Dict], key: Optional[Sequence[str]]) -> None:
+        columns = list(dict.fromkeys(col for record in chunk for col in record))
+        conn = self.client.getconn()
+        try:
+            with conn.cursor() as cur:
+                cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+                # Only the copied columns: LIKE would also copy NOT NULL on an identity id the COPY leaves out
+                cur.execute(sql.SQL("CREATE TEMP TABLE _jg_stage ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA")
+                            .format(cols, sql.Identifier(table)))
+                copy = sql.SQL("COPY _jg_stage ({}) FROM STDIN WITH (FORMAT csv, NULL {})").format(cols, sql.Literal(NULL))
+                cur.copy_expert(copy.as_string(conn), records_to_csv(chunk, columns))
+                cur.execute(self._merge_sql(table, columns, key))
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.client.putconn(conn, close=bool(conn.closed))  # Drop broken connections from the pool
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self.client.closeall()
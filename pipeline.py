@@ -0,0 +1,393 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import traceback
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple
+from workbook import WorkbookCache
+from header import HEADER_REGIONS, build_furnace_table, extract_furnace_data, extract_furnace_sheet, get_furnace_identifier
+from data import CONTAINER_REGIONS, GlassProductionAnalyzer, sheet_slices
+from defects_actions import DEFECTS_REGIONS, extract_defects, extract_defects_sheet, finalize_defects, sheet_defect_records
+from writer import BatchWriter
+from pgcopy import PG_DSN_ENV, CopyWriter, connect_pool
+from manifest import IngestManifest, changed_sheets, file_hash, grid_hash
+from gridcache import CACHE_DIR_ENV, CACHE_SIZE_ENV
+from readers import ENGINES, READER_ENGINE_ENV
+from store import STORE_DIR_ENV, LocalStore
+from schema import CONTAINERS_DATA, CONTAINERS_DEFECTS, FURNACE_DATA, compact_table, concat_compact
+import instrument
+
+# Supabase table fed by each extractor
+TABLES = {
+    "header": FURNACE_DATA.name,
+    "containers": CONTAINERS_DATA.name,
+    "defects": CONTAINERS_DEFECTS.name,
+}
+
+
+ALL_REGIONS = HEADER_REGIONS + CONTAINER_REGIONS + DEFECTS_REGIONS
+# Upload paths: the Supabase REST API, or COPY over a PostgreSQL connection pool (pgcopy.py)
+SINKS = ("rest", "copy")
+
+
+def make_writer(sink: str = "rest") -> BatchWriter:
+    """Create the writer for a sink; "copy" connects to JG_PG_DSN (or config.DB_CONFIG)."""
+    if sink == "copy":
+        return CopyWriter(connect_pool())
+    if sink != "rest":
+        raise ValueError(f"unknown sink {sink!r}, expected one of {SINKS}")
+    from main import supabase  # Import the Supabase client from main.py
+    return BatchWriter(supabase)
+
+
+def _extract_sheet_slice(file_path: str, sheet_names: List[str]) -> List[Tuple[dict, pd.DataFrame, pd.DataFrame]]:
+    """Worker entry point: decode a slice of the sheets once and run the three extractors' per-sheet steps on each."""
+    with WorkbookCache(file_path, ALL_REGIONS) as workbook:
+        analyzer = GlassProductionAnalyzer(file_path, workbook)
+        return [(extract_furnace_sheet(workbook, sheet), analyzer.process_sheet(sheet), extract_defects_sheet(workbook, sheet))
+                for sheet in sheet_names]
+
+
+def _extract_sheets_parallel(file_path: str, sheet_names: List[str], workers: int
+                             ) -> Tuple[List[dict], List[pd.DataFrame], List[pd.DataFrame]]:
+    """Run _extract_sheet_slice over contiguous slices in a process pool; per-extractor lists in sheet order."""
+    slices = sheet_slices(sheet_names, workers)
+    with ProcessPoolExecutor(max_workers=len(slices)) as pool:
+        per_sheet = [sheet for results in pool.map(_extract_sheet_slice, [file_path] * len(slices), slices) for sheet in results]
+    parts, containers, defects = (list(column) for column in zip(*per_sheet))
+    return parts, containers, defects
+
+
+def extract_workbook(workbook: WorkbookCache, workers: int, compact: bool = False) -> Dict[str, pd.DataFrame]:
+    """
+    Run the three extractors over an open WorkbookCache (each one is also recorded as an extract_* stage).
+    With workers > 1 and no sheet decoded yet, contiguous slices of the sheets are decoded and run
+    through all three extractors in a process pool (an extract_sheets stage); only the tables are
+    then built here. Otherwise every sheet is decoded once, here, and shared by the extractors.
+    """
+    file_path = workbook.file_path
+    furnace = get_furnace_identifier(os.path.basename(file_path))
+    sheets = workbook.sheet_names
+    if workers > 1 and len(sheets) > 1 and not any(workbook.is_decoded(sheet) for sheet in sheets):
+        with instrument.stage("extract_sheets", rows_in=len(sheets)):
+            parts, containers, defects = _extract_sheets_parallel(file_path, sheets, workers)
+        extractors = {
+            "header": lambda: _compact_if(build_furnace_table(parts, furnace), FURNACE_DATA, compact),
+            "containers": lambda: GlassProductionAnalyzer(file_path, workbook).combine_sheets(containers, compact),
+            "defects": lambda: _compact_if(finalize_defects(defects), CONTAINERS_DEFECTS, compact),
+        }
+    else:
+        extractors = {
+            "header": lambda: extract_furnace_data(workbook, furnace, compact),
+            "containers": lambda: GlassProductionAnalyzer(file_path, workbook).process_all_sheets(workers=workers, compact=compact),
+            "defects": lambda: extract_defects(workbook, compact),
+        }
+    tables = {}
+    for name, extract in extractors.items():
+        with instrument.stage(f"extract_{name}") as record:
+            tables[name] = extract()
+            record["rows_out"] = len(tables[name])
+    return tables
+
+
+def _compact_if(df: pd.DataFrame, schema, compact: bool) -> pd.DataFrame:
+    return compact_table(df, schema) if compact else df
+
+
+def extract_all(file_path: str, workers: int = 1, compact: bool = False) -> Dict[str, pd.DataFrame]:
+    """
+    Run the header, containers and defects extractions over one workbook.
+    Every sheet is decoded once, over the union of the extractors' regions, and shared by all three.
+    Args:
+        file_path (str): Path to the production report workbook
+        workers (int): Worker processes, each decoding and extracting a slice of the sheets
+        compact (bool): Return compact frames for analysis (see schema.compact_frame); not for upload_all
+    Returns:
+        Dict[str, pd.DataFrame]: Extracted tables keyed like TABLES
+    """
+    with WorkbookCache(file_path, ALL_REGIONS) as workbook:
+        return extract_workbook(workbook, workers, compact)
+
+
+def load_compact(paths: List[str], workers: int = 1) -> Dict[str, pd.DataFrame]:
+    """
+    Extract several workbooks (e.g. every furnace over several years) into one compact frame per table.
+    Returns:
+        Dict[str, pd.DataFrame]: Tables keyed like TABLES, with categories merged across workbooks
+    """
+    per_file = [extract_all(path, workers, compact=True) for path in paths]
+    return {name: concat_compact([tables[name] for tables in per_file]) for name in TABLES}
+
+
+def extract_changed(file_path: str, entry: Optional[Dict[str, object]], workers: int = 1
+                    ) -> Tuple[Dict[str, pd.DataFrame], str, Dict[str, str]]:
+    """
+    Like extract_all, but only for the sheets whose content differs from a manifest entry.
+    An unchanged workbook (same file hash) is not opened at all.
+    Args:
+        file_path (str): Path to the production report workbook
+        entry (Dict[str, object], optional): The workbook's IngestManifest entry
+        workers (int): Passed to extract_workbook, which extracts in this process anyway since
+            every sheet is already decoded here for its hash
+    Returns:
+        Tuple: Extracted tables (empty if nothing changed), the workbook hash and the hashes of the changed sheets
+    """
+    workbook_hash = file_hash(file_path)
+    if entry and entry.get("hash") == workbook_hash:
+        return {}, workbook_hash, {}
+    with WorkbookCache(file_path, ALL_REGIONS) as workbook:
+        sheet_hashes = {sheet: grid_hash(workbook.grid(sheet)) for sheet in workbook.sheet_names}
+        changed = changed_sheets(entry, sheet_hashes)
+        if not changed:
+            return {}, workbook_hash, {}
+        workbook.select_sheets(changed)
+        return extract_workbook(workbook, workers), workbook_hash, {sheet: sheet_hashes[sheet] for sheet in changed}
+
+
+def iter_workbook_records(workbook: WorkbookCache, entry: Optional[Dict[str, object]] = None,
+                          sheet_hashes: Optional[Dict[str, str]] = None) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Extract one sheet at a time and yield upload-ready (name, records) batches keyed like TABLES.
+    Containers and defects rows are yielded per sheet and the sheet's grid is dropped right after,
+    so memory does not grow with the number of sheets. The header table needs every sheet for its
+    pivot, so only its small per-sheet parts are kept and its records are yielded last.
+    Args:
+        workbook (WorkbookCache): Open workbook
+        entry (Dict[str, object], optional): The workbook's IngestManifest entry; sheets whose hash matches are skipped
+        sheet_hashes (Dict[str, str], optional): If given, sheets are hashed and the changed ones recorded here
+    """
+    workbook.add_regions(ALL_REGIONS)
+    furnace = get_furnace_identifier(os.path.basename(workbook.file_path))
+    analyzer = GlassProductionAnalyzer(workbook.file_path, workbook)
+    header_parts = []
+    for sheet in workbook.sheet_names:
+        if sheet_hashes is not None:
+            digest = grid_hash(workbook.grid(sheet))
+            if not changed_sheets(entry, {sheet: digest}):
+                workbook.evict(sheet)
+                continue
+            sheet_hashes[sheet] = digest
+        with instrument.stage("extract_sheet", sheet) as record:
+            header_parts.append(extract_furnace_sheet(workbook, sheet))
+            batches = {"containers": analyzer.sheet_records(sheet), "defects": sheet_defect_records(workbook, sheet)}
+            record["rows_out"] = sum(len(records) for records in batches.values())
+        workbook.evict(sheet)
+        yield from batches.items()
+    if header_parts:
+        with instrument.stage("extract_header") as record:
+            header = build_furnace_table(header_parts, furnace)
+            record["rows_out"] = len(header)
+        yield "header", header.replace({np.nan: None}).to_dict(orient="records")
+
+
+def stream_file(file_path: str, upload: bool = True, entry: Optional[Dict[str, object]] = None,
+                incremental: bool = False, sink: str = "rest") -> Tuple[Dict[str, int], Optional[str], Dict[str, str]]:
+    """
+    Stream one workbook sheet by sheet into a sink (see iter_workbook_records and make_writer).
+    Returns:
+        Tuple: Rows per table, the workbook hash and the hashes of the changed sheets (both only when incremental)
+    """
+    rows: Dict[str, int] = {}
+    workbook_hash, sheet_hashes = None, {}
+    if incremental:
+        workbook_hash = file_hash(file_path)
+        if entry and entry.get("hash") == workbook_hash:
+            return rows, workbook_hash, sheet_hashes
+    writer = make_writer(sink) if upload else None
+    store = LocalStore.from_env()
+    furnace = get_furnace_identifier(os.path.basename(file_path))
+    try:
+        with writer.stream() if writer else nullcontext() as stream, \
+                store.buffer(furnace) if store else nullcontext() as buffered, \
+                WorkbookCache(file_path, ALL_REGIONS) as workbook:
+            for name, records in iter_workbook_records(workbook, entry, sheet_hashes if incremental else None):
+                rows[name] = rows.get(name, 0) + len(records)
+                if buffered is not None:
+                    buffered.add(TABLES[name], pd.DataFrame(records))
+                if stream is not None:
+                    stream.send(TABLES[name], records)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, workbook_hash, sheet_hashes
+
+
+def store_tables(file_path: str, tables: Dict[str, pd.DataFrame], store: Optional[LocalStore] = None) -> None:
+    """Upsert extracted tables (keyed like TABLES) into the local store and its rollups, if one is configured (JG_STORE_DIR)."""
+    store = store if store is not None else LocalStore.from_env()
+    if store is None:
+        return
+    with instrument.stage("store", rows_in=sum(len(df) for df in tables.values())) as record:
+        touched = store.write({TABLES[name]: df for name, df in tables.items()},
+                              get_furnace_identifier(os.path.basename(file_path)))
+        record["partitions"] = len(touched)
+
+
+def upload_all(writer: BatchWriter, tables: Dict[str, pd.DataFrame]) -> None:
+    """Upsert each extracted table into its Supabase table through writer (see make_writer), in retried, concurrent chunks."""
+    for name, df in tables.items():
+        data_to_insert = df.replace({np.nan: None}).to_dict(orient="records")
+        writer.write(TABLES[name], data_to_insert)
+
+
+def upload_tables(sink: str, tables: Dict[str, pd.DataFrame]) -> None:
+    """Upload the extracted tables to a sink (see make_writer and upload_all), closing the writer afterwards."""
+    writer = make_writer(sink)
+    try:
+        upload_all(writer, tables)
+    finally:
+        writer.close()
+
+
+def collect_workbooks(patterns: List[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of .xlsx workbooks."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.xlsx")
+        for path in glob.glob(pattern):
+            # Skip Excel lock files ("~$F1 PROD REPORT ...")
+            if os.path.isfile(path) and not os.path.basename(path).startswith("~$"):
+                paths.add(path)
+    return sorted(paths)
+
+
+def run_file(file_path: str, upload: bool = True, workers: int = 1,
+             entry: Optional[Dict[str, object]] = None, incremental: bool = False,
+             report_dir: Optional[str] = None, stream: bool = False, sink: str = "rest") -> Dict[str, object]:
+    """
+    Extract (and optionally upload) one workbook, never raising.
+    With incremental=True only sheets changed since the manifest entry are extracted, and the
+    result carries the hashes to record once the upload has succeeded. With report_dir, a JSON
+    run report with per-stage (and per-sheet) timings, row counts and RSS at the start and end
+    of each stage is written there.
+    With stream=True sheets are extracted and sent one at a time (stream_file) instead of
+    building each table in memory first; workers is then ignored. sink picks the upload path
+    (see make_writer).
+    Returns:
+        Dict[str, object]: file, furnace, seconds, rows per table, hashes and the error text if it failed
+    """
+    result = {"file": file_path, "furnace": get_furnace_identifier(os.path.basename(file_path)),
+              "seconds": 0.0, "rows": {}, "error": None, "hash": None, "sheet_hashes": {}}
+    start = time.perf_counter()
+    with instrument.run("pipeline", report_dir, file=file_path, furnace=result["furnace"]) as report:
+        try:
+            if stream:
+                result["rows"], result["hash"], result["sheet_hashes"] = stream_file(file_path, upload, entry, incremental, sink)
+            elif incremental:
+                tables, result["hash"], result["sheet_hashes"] = extract_changed(file_path, entry, workers=workers)
+            else:
+                tables = extract_all(file_path, workers=workers)
+            if not stream:
+                result["rows"] = {name: len(df) for name, df in tables.items()}
+                store_tables(file_path, tables)
+                if upload:
+                    upload_tables(sink, tables)
+        except Exception:
+            result["error"] = traceback.format_exc()
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        report.context.update(rows=result["rows"], error=result["error"])
+    return result
+
+
+def run_batch(paths: List[str], workers: int = 1, upload: bool = True,
+              manifest: Optional[IngestManifest] = None, report_dir: Optional[str] = None,
+              stream: bool = False, sink: str = "rest") -> List[Dict[str, object]]:
+    """
+    Run every workbook through run_file across a process pool.
+    A failing workbook is reported in its result and does not stop the batch. With a manifest,
+    only changed sheets are processed and the manifest is updated for every uploaded workbook.
+    Returns:
+        List[Dict[str, object]]: One result per workbook, in the order of paths
+    """
+    incremental = manifest is not None
+    entries = [manifest.entry(path) if incremental else None for path in paths]
+    if workers <= 1 or len(paths) <= 1:
+        results = [run_file(path, upload, 1, entry, incremental, report_dir, stream, sink)
+                   for path, entry in zip(paths, entries)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            results = list(pool.map(run_file, paths, [upload] * len(paths), [1] * len(paths),
+                                    entries, [incremental] * len(paths), [report_dir] * len(paths),
+                                    [stream] * len(paths), [sink] * len(paths)))
+    if incremental and upload:
+        record_results(manifest, results)
+    return results
+
+
+def record_results(manifest: IngestManifest, results: List[Dict[str, object]]) -> None:
+    """Record the hashes of successfully uploaded workbooks and save the manifest."""
+    for result in results:
+        if not result["error"] and result["hash"]:
+            manifest.record(result["file"], result["hash"], result["sheet_hashes"])
+    manifest.save()
+
+
+def print_batch_report(results: List[Dict[str, object]]) -> None:
+    """Print per-file timings and failures."""
+    print("\n:bar_chart: Batch Report:")
+    for result in results:
+        status = "FAILED" if result["error"] else "ok"
+        rows = ", ".join(f"{name}={count}" for name, count in result["rows"].items())
+        if not result["error"] and not result["rows"]:
+            status, rows = "skip", "unchanged"
+        print(f"{status:6} {result['seconds']:>8.2f}s  {result['furnace'] or '-':4} {result['file']}  {rows}")
+    failures = [result for result in results if result["error"]]
+    for result in failures:
+        print(f"\n:warning: {result['file']} failed:\n{result['error']}")
+    print(f"\n:1234: {len(results) - len(failures)} of {len(results)} workbooks processed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract header, containers and defects data from JG production reports.")
+    parser.add_argument("paths", nargs="+", help="Workbooks, directories or glob patterns (e.g. 'E:\\proj1\\F* PROD REPORT *.xlsx')")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes across workbooks")
+    parser.add_argument("--sheet-workers", type=int, default=1,
+                        help="Worker processes, each extracting a slice of the sheets (single workbook only)")
+    parser.add_argument("--no-upload", action="store_true", help="Extract only, do not send to Supabase")
+    parser.add_argument("--manifest", default="ingest_manifest.json",
+                        help="Ingestion manifest; only sheets changed since the last upload are processed")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and process every sheet")
+    parser.add_argument("--report-dir", default="run_reports",
+                        help="Write a JSON run report (per-stage timings, rows, RSS) per workbook here; '' to disable")
+    parser.add_argument("--stream", action="store_true",
+                        help="Extract and send one sheet at a time (flat memory for large workbooks; ignores --sheet-workers)")
+    parser.add_argument("--sink", choices=SINKS, default="rest",
+                        help="Upload through the Supabase REST API, or COPY over a PostgreSQL connection pool (backfills)")
+    parser.add_argument("--pg-dsn", help="PostgreSQL connection string for --sink copy (default: config.DB_CONFIG)")
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="Spreadsheet reader: calamine if installed (auto), or force calamine/openpyxl")
+    parser.add_argument("--store", help="Also keep the tables as Parquet here (by furnace/month), with daily and monthly rollups")
+    parser.add_argument("--cache-dir", help="Keep decoded sheet grids as Parquet here and reuse them for unchanged workbooks")
+    parser.add_argument("--cache-size-mb", type=float, default=1024, help="Size bound of --cache-dir (LRU eviction)")
+    args = parser.parse_args()
+    if args.cache_dir:
+        # Picked up by every WorkbookCache, including those opened in worker processes
+        os.environ[CACHE_DIR_ENV] = args.cache_dir
+        os.environ[CACHE_SIZE_ENV] = str(args.cache_size_mb)
+    if args.pg_dsn:
+        os.environ[PG_DSN_ENV] = args.pg_dsn
+    if args.store:
+        os.environ[STORE_DIR_ENV] = args.store
+    os.environ[READER_ENGINE_ENV] = args.engine  # Also seen by worker processes
+    paths = collect_workbooks(args.paths)
+    if not paths:
+        parser.error("no .xlsx workbooks matched")
+    manifest = None if args.full else IngestManifest(args.manifest)
+    upload = not args.no_upload
+    if len(paths) == 1:
+        entry = manifest.entry(paths[0]) if manifest else None
+        results = [run_file(paths[0], upload, args.sheet_workers, entry, manifest is not None, args.report_dir,
+                            args.stream, args.sink)]
+        if manifest is not None and upload:
+            record_results(manifest, results)
+    else:
+        results = run_batch(paths, workers=args.workers, upload=upload, manifest=manifest, report_dir=args.report_dir,
+                            stream=args.stream, sink=args.sink)
+    print_batch_report(results)
+    sys.exit(1 if any(result["error"] for result in results) else 0)
@@ -0,0 +1,111 @@
+import datetime
+import os
+from typing import Iterator, List, Optional, Tuple
+from openpyxl import load_workbook
+
+try:
+    from python_calamine import CalamineError, CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Environment variable picking the reader engine (read by every worker process); "auto" otherwise
+READER_ENGINE_ENV = "JG_READER_ENGINE"
+ENGINES = ("auto", "calamine", "openpyxl")
+
+
+class OpenpyxlReader:
+    """Read-only openpyxl workbook; the reference engine the others must match."""
+    name = "openpyxl"
+
+    def __init__(self, file_path: str):
+        self.book = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.book.sheetnames
+
+    def worksheet(self, sheet_name: str):
+        worksheet = self.book[sheet_name]
+        worksheet.reset_dimensions()  # Stored dimensions are unreliable in old reports
+        return worksheet
+
+    def close(self) -> None:
+        self.book.close()
+
+
+def _calamine_cell(value: object) -> object:
+    """Return a calamine cell as openpyxl does: empty -> None, date-only cells -> datetime at midnight."""
+    if value == "":
+        return None
+    if type(value) is datetime.date:
+        return datetime.datetime.combine(value, datetime.time())
+    return value
+
+
+class _CalamineSheet:
+    """A calamine sheet with the openpyxl ``iter_rows(values_only=True)`` interface read_regions uses."""
+    def __init__(self, sheet):
+        self.sheet = sheet
+
+    def iter_rows(self, min_row: int = 1, min_col: int = 1, max_col: Optional[int] = None,
+                  values_only: bool = True) -> Iterator[Tuple[object, ...]]:
+        # calamine yields rows lazily from row 1, but each row only from the first used column on
+        first_col = self.sheet.start[1] + 1 if self.sheet.start else 1
+        width = max_col - min_col + 1 if max_col else None
+        for row_number, row in enumerate(self.sheet.iter_rows(), start=1):
+            if row_number < min_row:
+                continue
+            values = [None] * max(first_col - min_col, 0)
+            values += [_calamine_cell(value) for value in
+                       row[max(min_col - first_col, 0):None if max_col is None else max(max_col - first_col + 1, 0)]]
+            if width:
+                values = values[:width] + [None] * (width - len(values))
+            yield tuple(values)
+
+
+class CalamineReader:
+    """
+    Workbook read by calamine (Rust), several times faster than openpyxl.
+    Cell values match openpyxl once converted by read_regions, which reads whitespace-only
+    text as empty for both engines (calamine returns it as "").
+    """
+    name = "calamine"
+
+    def __init__(self, file_path: str):
+        if CalamineWorkbook is None:
+            raise ImportError("The calamine engine needs python-calamine (pip install python-calamine)")
+        self.book = CalamineWorkbook.from_path(file_path)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.book.sheet_names
+
+    def worksheet(self, sheet_name: str) -> _CalamineSheet:
+        return _CalamineSheet(self.book.get_sheet_by_name(sheet_name))
+
+    def close(self) -> None:
+        self.book.close()
+
+
+def open_reader(file_path: str, engine: Optional[str] = None):
+    """
+    Open a workbook with the requested engine.
+    Args:
+        file_path (str): Path to the Excel file
+        engine (str, optional): "calamine", "openpyxl" or "auto" (default: JG_READER_ENGINE, then "auto").
+            "auto" uses calamine when it is installed and can read the file, openpyxl otherwise.
+    Returns:
+        CalamineReader or OpenpyxlReader
+    """
+    engine = engine or os.environ.get(READER_ENGINE_ENV) or "auto"
+    if engine not in ENGINES:
+        raise ValueError(f"unknown reader engine {engine!r}, expected one of {ENGINES}")
+    if engine == "openpyxl" or (engine == "auto" and CalamineWorkbook is None):
+        return OpenpyxlReader(file_path)
+    if engine == "calamine":
+        return CalamineReader(file_path)
+    try:
+        return CalamineReader(file_path)
+    except CalamineError as e:
+        print(f":warning: calamine cannot read {os.path.basename(file_path)} ({e}), falling back to openpyxl")
+        return OpenpyxlReader(file_path)
@@ -0,0 +1,212 @@
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+from pandas.api.types import is_integer_dtype, union_categoricals
+import instrument
+
+# How the report date is written in V8 (e.g. "01.01.2025")
+SOURCE_DATE_FORMAT = "%d.%m.%Y"
+
+
+@dataclass(frozen=True)
+class Column:
+    """
+    One column of a jg_* table and how its cell values are converted.
+    dtype is one of:
+        "str": text (numbers as their str, empty cells stay empty)
+        "number": int or float as parsed, rounded to ``decimals``
+        "float": like "number", always float
+        "int": like "number", truncated to int, empty cells become 0
+        "date": parsed with SOURCE_DATE_FORMAT and formatted with ``fmt``
+    Numbers are rounded to ``source_decimals`` first (if set), then multiplied by ``scale``
+    and rounded to ``decimals``. ``category`` marks low-cardinality labels stored as
+    categoricals by compact_frame.
+    """
+    name: str
+    source: Union[str, Tuple[str, ...], None] = None  # Header label or column letter(s) the values come from
+    dtype: str = "number"
+    scale: float = 1
+    decimals: Optional[int] = 2
+    source_decimals: Optional[int] = None
+    fmt: Optional[str] = None
+    category: bool = False
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """A Supabase table: its columns, natural key and the conversion of columns not listed."""
+    name: str
+    columns: Tuple[Column, ...]
+    key: Tuple[str, ...] = ()
+    default: Optional[Column] = None
+
+    def column(self, name: str) -> Optional[Column]:
+        """The declared column, the default conversion for other names, or None."""
+        for column in self.columns:
+            if column.name == name:
+                return column
+        return self.default
+
+
+def convert_column(series: pd.Series, column: Column) -> pd.Series:
+    """Convert raw cell values (or text) to the column's dtype in one vectorized pass."""
+    if column.dtype == "str":
+        return series.where(series.isna(), series.astype(str))
+    if column.dtype == "date":
+        return pd.to_datetime(series, format=SOURCE_DATE_FORMAT).dt.strftime(column.fmt)
+    values = pd.to_numeric(series, errors="coerce")
+    if column.source_decimals is not None:
+        values = values.round(column.source_decimals)
+    if column.scale != 1:
+        values = values * column.scale
+    if column.decimals is not None:
+        values = values.round(column.decimals)
+    if column.dtype == "int":
+        return values.fillna(0).astype(int)
+    if column.dtype == "float":
+        return values.astype(float)
+    return values
+
+
+def apply_schema(df: pd.DataFrame, schema: TableSchema) -> pd.DataFrame:
+    """Convert every column of df that the schema declares (or has a default for); other columns are left as they are."""
+    for name in df.columns:
+        column = schema.column(name)
+        if column is not None:
+            df[name] = convert_column(df[name], column)
+    return df
+
+
+def _compact_number(series: pd.Series) -> pd.Series:
+    """Smallest int dtype (nullable Int* if there are gaps) for whole numbers, float32 otherwise."""
+    values = series.dropna()
+    if is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if len(values) and (values == values.round()).all():
+        smallest = pd.to_numeric(values.astype("int64"), downcast="integer").dtype
+        return series.astype(smallest.name.capitalize())  # e.g. int16 -> nullable Int16
+    return series.astype("float32")
+
+
+def compact_frame(df: pd.DataFrame, schema: TableSchema) -> pd.DataFrame:
+    """
+    Return a copy of an extracted table that takes far less memory, for analysis (not upload):
+    category columns become categoricals, dates datetime64 and numbers the smallest int/float dtype.
+    """
+    df = df.copy()
+    for name in df.columns:
+        column = schema.column(name)
+        if column is None:
+            continue
+        if column.category:
+            df[name] = df[name].astype("category")
+        elif column.dtype == "date":
+            df[name] = pd.to_datetime(df[name], format=column.fmt)
+        elif column.dtype in ("number", "float", "int"):
+            df[name] = _compact_number(pd.to_numeric(df[name], errors="coerce"))
+    return df
+
+
+def concat_compact(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate compact frames (e.g. several workbooks) without categoricals falling back to object."""
+    frames = [df.copy() for df in frames]
+    for name in frames[0].columns:
+        if all(isinstance(df[name].dtype, pd.CategoricalDtype) for df in frames if name in df):
+            categories = union_categoricals([df[name] for df in frames if name in df]).categories
+            for df in frames:
+                if name in df:
+                    df[name] = df[name].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, float]:
+    """Deep memory use of a frame before and after compact_frame, in MB."""
+    before_mb = before.memory_usage(deep=True).sum() / (1 << 20)
+    after_mb = after.memory_usage(deep=True).sum() / (1 << 20)
+    return {"before_mb": round(before_mb, 2), "after_mb": round(after_mb, 2),
+            "ratio": round(before_mb / after_mb, 1) if after_mb else float("inf")}
+
+
+def compact_table(df: pd.DataFrame, schema: TableSchema) -> pd.DataFrame:
+    """compact_frame, recorded as a "compact" stage and reported as memory before/after."""
+    with instrument.stage("compact", rows_in=len(df)) as record:
+        compacted = compact_frame(df, schema)
+        report = memory_report(df, compacted)
+        record.update(rows_out=len(compacted), **report)
+    print(f":bar_chart: {schema.name}: {report['before_mb']} MB -> {report['after_mb']} MB ({report['ratio']}x smaller)")
+    return compacted
+
+
+# === jg_furnace_data (header.py) ===
+# Sources are the Table 1 summary labels in B/K/P (rows 10-13) and the Table 2 row 15 headers
+# of K, M, N, O, Q, S, V, W, as header.clean_column_name leaves them (matched ignoring case).
+# Other labels become lowercased columns of their own, converted as numbers.
+FURNACE_DATA = TableSchema(
+    name="jg_furnace_data",
+    key=("furnace", "date"),
+    default=Column("", dtype="number"),
+    columns=(
+        Column("furnace", dtype="str", category=True),  # From the file name (F1, F2, ...)
+        Column("date", dtype="date", fmt="%Y-%m-%d"),  # The report date in V8
+        Column("std_glass_density", "Std_Glass_Density", "str"),
+        Column("daily_pack_percent", "Daily_Pack"),
+        Column("monthly_ton_percent", "Monthly_Ton"),
+        Column("ytd_pack_percent", "YTD_Pack", "float", scale=100),
+        Column("mc_gob_cut_output", "Mc_Gob_cut_Output_Furnace_glass_Pull_Ton"),
+        Column("gob_cut_output_quantity", "Gob_Cut_Output_Quantity"),
+        Column("actual_pack_quantity", "Actual_Pack_Quantity"),
+        Column("act_pack_eff", "Act_Pack_Eff", "float", scale=100),
+        Column("net", "Net", "float", scale=100),
+        Column("mc_dt_or_cgd", "Mc_Down_time_Jchange_Glass_draining_Cullet"),
+        Column("actual_glass_density"),  # The number in V13, e.g. "2.47 g/cc"
+    ),
+)
+
+# === jg_containers_data (data.py) ===
+# Sources are the row 15 header labels with whitespace runs replaced by "_"
+CONTAINERS_DATA = TableSchema(
+    name="jg_containers_data",
+    key=("Date", "Mc", "Shift", "Job_Name"),
+    columns=(
+        Column("Date", "V", "date", fmt="%Y.%m.%d"),
+        Column("Mc", "Mc", "str", category=True),
+        Column("Shift", "Shift", "str", category=True),
+        Column("Job_Name", "Job_Name", "str", category=True),
+        Column("number_of_section", "No.Of_Sect", "str", category=True),
+        Column("Speed_Bpm", "Speed_Bpm", "int"),
+        Column("Glass_Weight", "Glass_Weight", "int"),
+        Column("standard_hours", "Std-_Hrs", "int"),
+        Column("actual_hours", "Act-_Hrs", "int"),
+        Column("Furnace_Draw", "Furnace_Draw", "int"),
+        Column("Glass_Pull_Ton", "Mc_Gob_cut_Output_Furnace_glass_Pull_Ton", "int"),
+        Column("Pack_Ton", "Pack_Ton", "int"),
+        Column("Output_ Quantity", "Gob_Cut_Output_Quantity", "str"),
+        Column("pack_quantity", "Actual_-_Pack_Quantity", "int"),
+        Column("actual_pack_efficiency", "Act_Pack_Eff_%", "int", scale=100, source_decimals=2),
+        Column("Pass_Quantity", "Pass_Quantity", "int"),
+        Column("net", "Net_%", "int", scale=100, source_decimals=2),
+        Column("total_pack_quantity", "total_pack_quantity", "number"),
+        Column("Output_Quantity", dtype="float"),  # Not in the sheet; only ever nulled for idle machines
+        Column("Sheet_Name", dtype="str", category=True),
+    ),
+)
+
+# === jg_containers_defects (defects_actions.py) ===
+# Sources are column letters; text spread over several columns is joined with spaces
+CONTAINERS_DEFECTS = TableSchema(
+    name="jg_containers_defects",
+    key=("Date", "MC", "Shift"),
+    columns=(
+        Column("Date", "V", "date", fmt="%Y.%m.%d"),
+        Column("MC", ("B",), "str", category=True),
+        Column("Job_Name", ("C", "D", "E"), "str", category=True),
+        Column("Shift", ("F",), "str", category=True),
+        Column("IC_Percent", ("G",), "float", scale=100),
+        Column("IM_Percent", ("H",), "float", scale=100),
+        Column("Defects_and_actions", ("I", "J", "K", "L", "M"), "str"),
+        Column("Stopages", ("N", "O", "P", "Q", "R", "S", "T", "U", "V", "W"), "str"),
+        Column("Dept", ("X",), "str", category=True),
+    ),
+)
+
+SCHEMAS: Dict[str, TableSchema] = {schema.name: schema for schema in (FURNACE_DATA, CONTAINERS_DATA, CONTAINERS_DEFECTS)}
@@ -0,0 +1,328 @@
+import os
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from fileio import atomic_path, require_parquet
+from schema import CONTAINERS_DATA, CONTAINERS_DEFECTS, SCHEMAS, TableSchema
+import instrument
+
+# Environment variable that enables the store for every pipeline run (scripts and worker processes)
+STORE_DIR_ENV = "JG_STORE_DIR"
+PARTITION_FILE = "data.parquet"
+UNKNOWN_FURNACE = "unknown"  # Workbooks whose file name carries no furnace id
+
+# Rollup grain: one row per furnace, day (or month), machine and shift
+DAILY_KEYS = ("furnace", "date", "mc", "shift")
+MONTHLY_KEYS = ("furnace", "month", "mc", "shift")
+# Rollup column -> containers/defects column; sums are kept as totals, means as a _sum and a _n column
+CONTAINER_SUMS = {"pack_ton": "Pack_Ton", "glass_pull_ton": "Glass_Pull_Ton", "output_quantity": "Output_ Quantity",
+                  "pack_quantity": "pack_quantity", "pass_quantity": "Pass_Quantity"}
+# Percentages of a quantity, averaged weighted by it (pack efficiency = packed / gob cut output,
+# net = pack ton / glass pull), kept as a _wsum (value x weight) and a _weight column
+CONTAINER_WEIGHTED = {"pack_efficiency": ("actual_pack_efficiency", "Output_ Quantity"),
+                      "net_percent": ("net", "Glass_Pull_Ton")}
+DEFECT_MEANS = {"ic_percent": "IC_Percent", "im_percent": "IM_Percent"}
+# Defect counts: rows of the defects block with text in these columns
+DEFECT_COUNTS = {"defect_reports": "Defects_and_actions", "stoppage_reports": "Stopages"}
+
+
+def _date_column(schema: TableSchema) -> str:
+    return next(column.name for column in schema.columns if column.dtype == "date")
+
+
+def _to_store(df: pd.DataFrame, schema: TableSchema) -> pd.DataFrame:
+    """Store representation: dates as datetime64 and labels as categoricals; numbers keep full precision."""
+    df = df.copy()
+    df.columns.name = None
+    for column in schema.columns:
+        if column.name not in df:
+            continue
+        if column.dtype == "date" and not pd.api.types.is_datetime64_any_dtype(df[column.name]):
+            df[column.name] = pd.to_datetime(df[column.name], format=column.fmt)
+        elif column.category:
+            df[column.name] = df[column.name].astype(str).where(df[column.name].notna()).astype("category")
+    return df
+
+
+def _months(df: pd.DataFrame, schema: TableSchema) -> Set[str]:
+    """The "YYYY-MM" months of an extracted (not yet converted) table's rows."""
+    column = schema.column(_date_column(schema))
+    return set(pd.to_datetime(df[column.name], format=column.fmt).dt.strftime("%Y-%m").dropna())
+
+
+def _nonempty(series: pd.Series) -> pd.Series:
+    return series.notna() & (series.astype(str).str.strip() != "")
+
+
+def _measures(df: pd.DataFrame, sums: Dict[str, str], means: Dict[str, str],
+              weighted: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+    out = pd.DataFrame(index=df.index)
+    for name, source in sums.items():
+        out[name] = pd.to_numeric(df[source], errors="coerce")
+    for name, source in means.items():
+        values = pd.to_numeric(df[source], errors="coerce")
+        out[f"{name}_sum"] = values
+        out[f"{name}_n"] = values.notna().astype(int)
+    for name, (source, weight) in weighted.items():
+        values = pd.to_numeric(df[source], errors="coerce")
+        weights = pd.to_numeric(df[weight], errors="coerce").where(values.notna())
+        out[f"{name}_wsum"] = values * weights
+        out[f"{name}_weight"] = weights
+    return out
+
+
+def _group_daily(df: pd.DataFrame, mc_col: str, measures: pd.DataFrame) -> pd.DataFrame:
+    labels = {"mc": mc_col, "shift": "Shift"}
+    keys = pd.DataFrame({"furnace": df["furnace"].astype(str), "date": df["Date"]})
+    for name, source in labels.items():
+        keys[name] = df[source].astype(str).where(df[source].notna())
+    return pd.concat([keys, measures], axis=1).groupby(list(DAILY_KEYS)).sum(min_count=1)
+
+
+def daily_rollup(containers: Optional[pd.DataFrame], defects: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Aggregate stored containers and defects rows to one row per furnace, date, machine and shift.
+    Returns:
+        pd.DataFrame: DAILY_KEYS, containers_rows, CONTAINER_SUMS totals, _wsum/_weight pairs for
+            CONTAINER_WEIGHTED, _sum/_n pairs for DEFECT_MEANS, defect_rows and DEFECT_COUNTS
+    """
+    parts = []
+    if containers is not None and not containers.empty:
+        measures = _measures(containers, CONTAINER_SUMS, {}, CONTAINER_WEIGHTED).assign(containers_rows=1)
+        parts.append(_group_daily(containers, "Mc", measures))
+    if defects is not None and not defects.empty:
+        measures = _measures(defects, {}, DEFECT_MEANS, {}).assign(defect_rows=1)
+        for name, source in DEFECT_COUNTS.items():
+            measures[name] = _nonempty(defects[source]).astype(int)
+        parts.append(_group_daily(defects, "MC", measures))
+    if not parts:
+        return pd.DataFrame(columns=list(DAILY_KEYS))
+    daily = parts[0].join(parts[1], how="outer") if len(parts) == 2 else parts[0]
+    counts = [col for col in daily if col.endswith(("_n", "_rows", "_reports"))]
+    daily[counts] = daily[counts].fillna(0).astype(int)
+    return daily.reset_index()
+
+
+def monthly_rollup(daily: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate a daily rollup to one row per furnace, month, machine and shift (plus its number of days)."""
+    if daily.empty:
+        return pd.DataFrame(columns=list(MONTHLY_KEYS))
+    daily = daily.assign(month=daily["date"].dt.strftime("%Y-%m"), days=1).drop(columns="date")
+    return daily.groupby(list(MONTHLY_KEYS)).sum(min_count=1).reset_index()
+
+
+def finish_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn the _wsum/_weight and _sum/_n pairs of a rollup into (weighted) means, e.g. pack_efficiency, for reporting."""
+    df = df.copy()
+    for name in CONTAINER_WEIGHTED:
+        if f"{name}_wsum" in df:
+            df[name] = (df[f"{name}_wsum"] / df[f"{name}_weight"].where(df[f"{name}_weight"] > 0)).round(2)
+            df = df.drop(columns=[f"{name}_wsum", f"{name}_weight"])
+    for name in DEFECT_MEANS:
+        if f"{name}_sum" in df:
+            df[name] = (df[f"{name}_sum"] / df[f"{name}_n"].where(df[f"{name}_n"] > 0)).round(2)
+            df = df.drop(columns=[f"{name}_sum", f"{name}_n"])
+    return df
+
+
+class LocalStore:
+    """
+    Parquet copy of the extracted tables, partitioned by furnace and month, with daily and monthly
+    rollups that are recomputed only for the partitions a write touches.
+    Layout: <root>/<table>/furnace=F1/month=2025-01/data.parquet and
+    <root>/rollups/{daily,monthly}/furnace=F1/month=2025-01/data.parquet.
+    Writes upsert on the table's natural key (plus furnace), so re-running a workbook is safe.
+    Partitions are replaced atomically, but two processes must not write the same furnace and
+    month at once (normally one workbook per furnace and month).
+    """
+    def __init__(self, root: str):
+        """
+        Args:
+            root (str): Store directory (created if missing)
+        """
+        require_parquet()
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["LocalStore"]:
+        """Return the store configured through JG_STORE_DIR, if any."""
+        root = os.environ.get(STORE_DIR_ENV)
+        return cls(root) if root else None
+
+    def _partition(self, table: str, furnace: str, month: str) -> str:
+        return os.path.join(self.root, table, f"furnace={furnace}", f"month={month}", PARTITION_FILE)
+
+    def _read_partition(self, path: str) -> Optional[pd.DataFrame]:
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def _write_partition(self, path: str, df: pd.DataFrame) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_path(path) as tmp_path:
+            df.to_parquet(tmp_path, index=False)
+
+    def partitions(self, table: str, furnace: Optional[str] = None, start: Optional[str] = None,
+                   end: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """(furnace, month, path) of the stored partitions of a table, pruned by furnace and month range."""
+        first = pd.Timestamp(start).strftime("%Y-%m") if start else None
+        last = pd.Timestamp(end).strftime("%Y-%m") if end else None
+        found = []
+        table_dir = os.path.join(self.root, table)
+        for furnace_dir in sorted(os.listdir(table_dir)) if os.path.isdir(table_dir) else []:
+            name = furnace_dir.split("=", 1)[-1]
+            if furnace is not None and name != furnace:
+                continue
+            for month_dir in sorted(os.listdir(os.path.join(table_dir, furnace_dir))):
+                month = month_dir.split("=", 1)[-1]
+                path = os.path.join(table_dir, furnace_dir, month_dir, PARTITION_FILE)
+                if (first and month < first) or (last and month > last) or not os.path.exists(path):
+                    continue
+                found.append((name, month, path))
+        return found
+
+    def write(self, tables: Dict[str, pd.DataFrame], furnace: Optional[str] = None) -> Set[Tuple[str, str]]:
+        """
+        Upsert extracted tables and refresh the rollups of the partitions they touch.
+        Args:
+            tables (Dict[str, pd.DataFrame]): Frames keyed by Supabase table name (see schema.SCHEMAS)
+            furnace (str, optional): Furnace id for tables without a furnace column (containers, defects)
+        Returns:
+            Set[Tuple[str, str]]: The (furnace, month) partitions written
+        """
+        touched = set()
+        for table, df in tables.items():
+            if df is None or df.empty:
+                continue
+            schema = SCHEMAS[table]
+            df = _to_store(df, schema)
+            if "furnace" not in df:
+                df.insert(0, "furnace", furnace or UNKNOWN_FURNACE)
+            df["furnace"] = df["furnace"].fillna(furnace or UNKNOWN_FURNACE).astype(str)
+            date_col = _date_column(schema)
+            key = ["furnace"] + [col for col in schema.key if col != "furnace"]
+            months = df[date_col].dt.strftime("%Y-%m")
+            for (part_furnace, month), part in df.groupby([df["furnace"], months]):
+                path = self._partition(table, part_furnace, month)
+                existing = self._read_partition(path)
+                if existing is not None:
+                    part = _to_store(pd.concat([existing, part], ignore_index=True), schema)
+                part = part.drop_duplicates(subset=key, keep="last").sort_values([date_col] + key[1:])
+                self._write_partition(path, part.reset_index(drop=True))
+                touched.add((part_furnace, month))
+        for part_furnace, month in sorted(touched):
+            self.refresh_rollups(part_furnace, month)
+        return touched
+
+    def buffer(self, furnace: Optional[str] = None) -> "StoreBuffer":
+        """Collect streamed per-sheet batches and write them once per month (see StoreBuffer)."""
+        return StoreBuffer(self, furnace)
+
+    def refresh_rollups(self, furnace: str, month: str) -> None:
+        """Recompute the daily and monthly rollups of one furnace and month from its stored rows."""
+        containers = self._read_partition(self._partition(CONTAINERS_DATA.name, furnace, month))
+        defects = self._read_partition(self._partition(CONTAINERS_DEFECTS.name, furnace, month))
+        daily = daily_rollup(containers, defects)
+        if daily.empty:
+            return
+        self._write_partition(self._partition(os.path.join("rollups", "daily"), furnace, month), daily)
+        self._write_partition(self._partition(os.path.join("rollups", "monthly"), furnace, month), monthly_rollup(daily))
+
+    def read(self, table: str, furnace: Optional[str] = None, start: Optional[str] = None,
+             end: Optional[str] = None) -> pd.DataFrame:
+        """Stored rows of a table for a furnace (all if None) and an inclusive date range, reading only matching partitions."""
+        frames = [pd.read_parquet(path) for _, _, path in self.partitions(table, furnace, start, end)]
+        if not frames:
+            return pd.DataFrame()
+        df = _to_store(pd.concat(frames, ignore_index=True), SCHEMAS[table])
+        date_col = _date_column(SCHEMAS[table])
+        if start:
+            df = df[df[date_col] >= pd.Timestamp(start)]
+        if end:
+            df = df[df[date_col] <= pd.Timestamp(end)]
+        return df.reset_index(drop=True)
+
+    def rollup(self, level: str = "daily", furnace: Optional[str] = None, start: Optional[str] = None,
+               end: Optional[str] = None, by: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Read precomputed aggregates instead of re-aggregating raw rows.
+        Args:
+            level (str): "daily" (DAILY_KEYS) or "monthly" (MONTHLY_KEYS)
+            furnace (str, optional): Only this furnace
+            start (str, optional): First day (daily) or month (monthly), e.g. "2025-01-01" / "2025-01"
+            end (str, optional): Last day or month, inclusive
+            by (Iterable[str], optional): Coarser grouping from the level's keys, e.g. ("furnace", "mc");
+                days is then the number of distinct dates in each group
+        Returns:
+            pd.DataFrame: Totals (pack_ton, ...), counts and means (pack_efficiency, net_percent, ...)
+        """
+        keys = {"daily": DAILY_KEYS, "monthly": MONTHLY_KEYS}.get(level)
+        if keys is None:
+            raise ValueError(f"unknown rollup level {level!r}, expected 'daily' or 'monthly'")
+        frames = [pd.read_parquet(path) for _, _, path in self.partitions(os.path.join("rollups", level), furnace, start, end)]
+        if not frames:
+            return pd.DataFrame(columns=list(by or keys))
+        df = pd.concat(frames, ignore_index=True)
+        if level == "daily":
+            if start:
+                df = df[df["date"] >= pd.Timestamp(start)]
+            if end:
+                df = df[df["date"] <= pd.Timestamp(end)]
+        if by is not None:
+            by = list(by)
+            unknown = set(by) - set(keys)
+            if unknown:
+                raise ValueError(f"cannot group a {level} rollup by {sorted(unknown)}, expected some of {keys}")
+            grouped = df.drop(columns=[key for key in keys if key not in by]).groupby(by).sum(min_count=1)
+            # Days overlap between machines and shifts, so count distinct dates instead of adding them up
+            dates = df if level == "daily" else self._daily_dates(furnace, start, end)
+            grouped["days"] = dates.groupby(by)["date"].nunique()
+            df = grouped.reset_index()
+        return finish_rollup(df.reset_index(drop=True))
+
+    def _daily_dates(self, furnace: Optional[str], start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        """MONTHLY_KEYS and date of every daily rollup row in the furnace and month range."""
+        frames = [pd.read_parquet(path, columns=list(DAILY_KEYS))
+                  for _, _, path in self.partitions(os.path.join("rollups", "daily"), furnace, start, end)]
+        dates = pd.concat(frames, ignore_index=True)
+        return dates.assign(month=dates["date"].dt.strftime("%Y-%m"))
+
+
+class StoreBuffer:
+    """
+    Buffer the per-sheet batches of a streamed workbook and write them one month at a time, so each
+    partition and its rollups are rewritten once per month instead of once per sheet.
+    Only the current month's rows are held; a batch from another month flushes them first.
+    """
+    def __init__(self, store: LocalStore, furnace: Optional[str] = None):
+        self.store = store
+        self.furnace = furnace
+        self.pending: Dict[str, List[pd.DataFrame]] = {}
+        self.months: Set[str] = set()
+        self.touched: Set[Tuple[str, str]] = set()
+
+    def add(self, table: str, df: pd.DataFrame) -> None:
+        """Buffer an extracted batch of a table (keyed by Supabase table name)."""
+        if df.empty:
+            return
+        months = _months(df, SCHEMAS[table])
+        if self.pending and months != self.months:
+            self.flush()
+        self.pending.setdefault(table, []).append(df)
+        self.months = months
+
+    def flush(self) -> None:
+        """Write the buffered batches and refresh their rollups."""
+        if not self.pending:
+            return
+        tables = {table: pd.concat(frames, ignore_index=True) for table, frames in self.pending.items()}
+        with instrument.stage("store", rows_in=sum(len(df) for df in tables.values())) as record:
+            written = self.store.write(tables, self.furnace)
+            record["partitions"] = len(written)
+        self.touched |= written
+        self.pending, self.months = {}, set()
+
+    def __enter__(self) -> "StoreBuffer":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.flush()
@@ -0,0 +1,141 @@
+import argparse
+import datetime
+import random
+from openpyxl import Workbook
+from openpyxl.utils import column_index_from_string
+
+# Width of the old JG layout (A..X)
+N_COLS = column_index_from_string("X")
+SHIFTS = ["A", "B", "C"]
+JOBS = ["(BTL-650ML)", "(JAR-400ML)", "(BTL-330ML)", "(VIAL-30ML)", "(BTL-1L)"]
+# Summary pairs read by header.py from Excel rows 10-13
+SUMMARY = {
+    ("B", "F"): ["Furnace Pull:", "Daily Pack:", "Monthly Ton:", "Std Glass Density:"],
+    ("K", "M"): ["Gob Weight Avg:", "Cullet Ton:", "Machine Count:", "Monthly Pack:"],
+    ("P", "S"): ["Daily Ton:", "Pack Ton Total:", "Job Changes:", "YTD Pack %:"],
+}
+# Row 15 header of the containers table (cleaned by data.py and, for K..W, header.py)
+CONTAINER_HEADERS = {
+    "B": "Mc", "C": "Shift", "D": "Job Name", "E": "No.Of Sect", "F": "Speed Bpm", "G": "Glass Weight",
+    "H": "Std- Hrs", "I": "Act- Hrs", "J": "Furnace Draw", "K": "Mc Gob cut Output Furnace glass Pull Ton",
+    "L": "Pack Ton", "M": "Gob Cut Output Quantity", "N": "Actual - Pack Quantity", "O": "Act Pack Eff %",
+    "P": "Pass Quantity", "Q": "Net %", "R": "total pack quantity", "S": "Job Change Loss",
+    "V": "Mc Down time (J.change / Glass draining / Cullet)", "W": "Stoppage Hrs",
+}
+DEFECT_HEADERS = {"B": "MC", "C": "Job Name", "F": "Shift", "G": "IC%", "H": "IM%",
+                  "I": "Defects & Actions", "N": "Stoppages", "X": "Dept"}
+DEFECTS = ["Blister", "Stone", "Seed", "Check", "Thin bottom", "Bird swing", "Choke neck"]
+STOPPAGES = ["Mould change", "Swab", "Power cut", "Gob problem", "Conveyor jam"]
+DEPTS = ["Hot End", "Cold End", "Mould Shop", "Electrical"]
+
+
+def _row(**cells) -> list:
+    row = [None] * N_COLS
+    for col, value in cells.items():
+        row[column_index_from_string(col) - 1] = value
+    return row
+
+
+def _sheet_rows(rng: random.Random, furnace: str, day: datetime.date, machines: int) -> list:
+    """Build the rows (Excel row 1 first) of one daily sheet in the old JG layout."""
+    rows = [_row(B=f"JG GLASS - {furnace} DAILY PRODUCTION REPORT")] + [_row() for _ in range(6)]
+    rows.append(_row(U="Date:", V=day.strftime("%d.%m.%Y")))  # Row 8
+    rows.append(_row())  # Row 9
+    for i in range(4):  # Rows 10-13
+        cells = {}
+        for (label_col, value_col), labels in SUMMARY.items():
+            cells[label_col] = labels[i]
+            cells[value_col] = round(rng.uniform(0.5, 0.99), 4) if "%" in labels[i] else round(rng.uniform(1, 400), 2)
+        if i == 3:
+            cells["U"] = "Actual Glass Density:"
+            cells["V"] = f"{rng.uniform(2.45, 2.52):.3f} g/cc"  # Row 13, parsed by header.py
+        rows.append(_row(**cells))
+    rows.append(_row())  # Row 14
+    rows.append(_row(**CONTAINER_HEADERS))  # Row 15
+    totals = {}
+    for m in range(machines):
+        mc = f"{furnace}{m + 1}"
+        job = rng.choice(JOBS)
+        for shift in SHIFTS:
+            pull = round(rng.uniform(5, 40), 2)
+            pack = round(pull * rng.uniform(0.7, 0.95), 2)
+            output = rng.randint(20000, 120000)
+            packed = int(output * rng.uniform(0.75, 0.97))
+            cells = dict(
+                B=mc if shift == "A" else None, C=shift, D=job, E=rng.choice([6, 8, 10, 12]),
+                F=rng.randint(60, 240), G=rng.randint(150, 600), H=8, I=round(rng.uniform(6, 8), 2),
+                J=round(pull * 1.02, 2), K=pull, L=pack, M=output, N=packed, O=round(packed / output, 4),
+                P=int(packed * 0.99), Q=round(pack / pull, 4), R=packed * (SHIFTS.index(shift) + 1),
+            )
+            roll = rng.random()
+            if roll < 0.04:
+                cells["E"] = "Job change"
+            elif roll < 0.07:
+                cells["D"] = "MC DRAINING"
+            elif roll < 0.09:
+                cells["D"] = "SD - Shut down"
+            for col in "KLMN":
+                if isinstance(cells[col], (int, float)):
+                    totals[col] = totals.get(col, 0) + cells[col]
+            rows.append(_row(**cells))
+    total = dict(B="Total", C="Total", O=0.88, Q=0.9, S=round(rng.uniform(0, 5), 2),
+                 V=round(rng.uniform(0, 12), 2), W=round(rng.uniform(0, 6), 2))
+    total.update({col: round(value, 2) for col, value in totals.items()})
+    rows.append(_row(**total))
+    rows += [_row(), _row()]
+    rows.append(_row(**DEFECT_HEADERS))
+    for m in range(machines):
+        mc = f"{furnace}{m + 1}"
+        for shift in SHIFTS:
+            defect_words = rng.sample(DEFECTS, rng.randint(0, 3))
+            cells = dict(
+                B=mc if shift == "A" else None, C=rng.choice(JOBS) if shift == "A" else None, F=shift,
+                G=round(rng.uniform(0, 0.05), 4), H=round(rng.uniform(0, 0.05), 4),
+                X=rng.choice(DEPTS) if defect_words else None,
+            )
+            for col, word in zip("IJKLM", defect_words):
+                cells[col] = f"{word} -\ncorrected"
+            for col, word in zip("NOPQRSTUVW", rng.sample(STOPPAGES, rng.randint(0, 2))):
+                cells[col] = f"{word}  {rng.randint(5, 90)} min"
+            rows.append(_row(**cells))
+    rows.append(_row(B="Daily Remarks:", C="Generated sheet"))
+    return rows
+
+
+def generate_workbook(path: str, sheets: int = 31, machines: int = 8, furnace: str = "F1",
+                      start_date: datetime.date = datetime.date(2025, 1, 1), seed: int = 0) -> str:
+    """
+    Write a synthetic production report in the old JG layout, one sheet per day.
+    Args:
+        path (str): Output .xlsx path (name it like "F1 PROD REPORT JAN 2025.xlsx" to carry the furnace id)
+        sheets (int): Number of daily sheets
+        machines (int): Machines per sheet (the "Total" row and the defects block move down with it)
+        furnace (str): Furnace id used for the Mc/MC labels
+        start_date (datetime.date): Date of the first sheet
+        seed (int): Random seed, so the same arguments give the same workbook
+    Returns:
+        str: path
+    """
+    if machines < 1:
+        raise ValueError("machines must be at least 1")
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    for i in range(sheets):
+        day = start_date + datetime.timedelta(days=i)
+        ws = wb.create_sheet(title=day.strftime("%d.%m.%y"))
+        for row in _sheet_rows(rng, furnace, day, machines):
+            ws.append(row)
+    wb.save(path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic JG production report workbook.")
+    parser.add_argument("path", help="Output .xlsx path")
+    parser.add_argument("--sheets", type=int, default=31)
+    parser.add_argument("--machines", type=int, default=8)
+    parser.add_argument("--furnace", default="F1")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_workbook(args.path, args.sheets, args.machines, args.furnace, seed=args.seed)
+    print(f":white_check_mark: Wrote {args.sheets} sheets to {args.path}")
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+import defects_actions
+from defects_actions import DEFECTS_REGIONS, extract_defects_sheet, fill_job_names
+from synthetic import generate_workbook
+from workbook import WorkbookCache
+
+
+def fill_job_names_loop(mc: pd.Series, job_names: pd.Series) -> pd.Series:
+    """The iterrows / job_name_mapping loop extract_defects used before fill_job_names (the reference)."""
+    temp_df = pd.DataFrame({"MC": mc, "Job_Name": job_names})
+    job_name_mapping = {}
+    for index, row in temp_df.iterrows():
+        mc_value = row['MC']
+        job_name_value = row['Job_Name']
+        if pd.notna(job_name_value) and job_name_value != "NaN" and job_name_value != "":
+            job_name_mapping[mc_value] = job_name_value
+        elif mc_value in job_name_mapping:
+            temp_df.at[index, 'Job_Name'] = job_name_mapping[mc_value]
+    return temp_df["Job_Name"]
+
+
+def _mc(values):
+    # As extract_defects_sheet builds it: joined text, "" -> NA, filled down
+    return pd.Series(values, dtype=object, name="MC").replace("", pd.NA).ffill()
+
+
+@pytest.mark.parametrize("mc, job_names", [
+    # Rows before the first MC
+    (["", "", "F11", "", ""], ["(JAR)", "", "(BTL)", "", ""]),
+    (["", "", "F11", ""], ["", "", "(BTL)", ""]),
+    # Literal "NaN" text, with and without an earlier job
+    (["F11", "", "F12", ""], ["NaN", "(BTL)", "(JAR)", "NaN"]),
+    # Blank names with no earlier job for their MC
+    (["F11", "", "", "F12", ""], ["", "", "(BTL)", "", ""]),
+    # Missing cells and an MC that comes back later
+    (["F11", "F12", "F11", ""], ["(BTL)", None, float("nan"), ""]),
+    # Nothing to fill
+    (["F11", "F12"], ["(BTL)", "(JAR)"]),
+])
+def test_fill_job_names_matches_loop(mc, job_names):
+    mc = _mc(mc)
+    job_names = pd.Series(job_names, dtype=object, name="Job_Name")
+    pd.testing.assert_series_equal(fill_job_names(mc, job_names), fill_job_names_loop(mc, job_names))
+
+
+def test_fill_job_names_matches_loop_on_synthetic_sheets(tmp_path, monkeypatch):
+    path = str(tmp_path / "F1 PROD REPORT JAN 2025.xlsx")
+    generate_workbook(path, sheets=5, machines=6, seed=7)
+    calls = []
+
+    def checked(mc, job_names):
+        filled = fill_job_names(mc, job_names)
+        pd.testing.assert_series_equal(filled, fill_job_names_loop(mc, job_names))
+        calls.append(filled)
+        return filled
+    monkeypatch.setattr(defects_actions, "fill_job_names", checked)
+    with WorkbookCache(path, DEFECTS_REGIONS) as workbook:
+        for sheet in workbook.sheet_names:
+            extract_defects_sheet(workbook, sheet)
+    assert len(calls) == 5
+    # Shifts B and C have no Job_Name in the sheet and take shift A's
+    assert all(filled.iloc[1:].ne("").all() for filled in calls)
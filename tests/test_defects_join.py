@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+import defects_actions
+from defects_actions import DEFECTS_REGIONS, extract_defects, join_non_empty
+from synthetic import generate_workbook
+from workbook import WorkbookCache
+
+
+def join_non_empty_columnwise(block: pd.DataFrame) -> pd.Series:
+    """The column-by-column join extract_defects_sheet used before join_non_empty was vectorized (the reference)."""
+    joined = block.iloc[:, 0]
+    for i in range(1, block.shape[1]):
+        col = block.iloc[:, i]
+        # Both present: "a b"; one missing: keep the other
+        joined = (joined + " " + col).fillna(joined).fillna(col)
+    return joined.fillna("")
+
+
+@pytest.mark.parametrize("rows", [
+    # Gaps before, between and after the text, and rows with nothing at all
+    [["a", np.nan, "b"], [np.nan, np.nan, np.nan], [np.nan, "c", np.nan], ["d", "e", "f"]],
+    # Spaces inside and around cells are kept as they are
+    [["  a ", "b  c", np.nan], [np.nan, " ", "x"]],
+    # One column (MC, Shift, Dept)
+    [["F11"], [np.nan], ["A"]],
+    # No rows
+    np.empty((0, 3), dtype=object),
+])
+def test_join_non_empty_matches_columnwise(rows):
+    block = pd.DataFrame(rows, dtype=object, index=range(10, 10 + len(rows)))
+    pd.testing.assert_series_equal(join_non_empty(block), join_non_empty_columnwise(block), check_names=False)
+
+
+def test_defects_table_matches_columnwise_join(tmp_path, monkeypatch):
+    path = str(tmp_path / "F1 PROD REPORT JAN 2025.xlsx")
+    generate_workbook(path, sheets=5, machines=6, seed=11)
+    with WorkbookCache(path, DEFECTS_REGIONS) as workbook:
+        vectorized = extract_defects(workbook)
+        monkeypatch.setattr(defects_actions, "join_non_empty", join_non_empty_columnwise)
+        columnwise = extract_defects(workbook)
+    assert len(vectorized) > 0
+    pd.testing.assert_frame_equal(vectorized, columnwise)
@@ -0,0 +1,42 @@
+import glob
+import os
+import pandas as pd
+import pytest
+from defects_actions import DEFECTS_REGIONS
+from gridcache import GridCache
+from synthetic import generate_workbook
+from workbook import WorkbookCache
+
+pytest.importorskip("pyarrow")
+
+
+def _truncate(f):
+    f.truncate(f.seek(0, os.SEEK_END) // 2)  # Cut off mid-write, e.g. by a crash
+
+
+def _overwrite(f):
+    f.seek(0)
+    f.truncate()
+    f.write(b"not parquet")
+
+
+@pytest.mark.parametrize("corrupt", [_truncate, _overwrite])
+def test_corrupt_entry_is_dropped_and_decoded_again(tmp_path, capsys, corrupt):
+    path = str(tmp_path / "F1 PROD REPORT JAN 2025.xlsx")
+    generate_workbook(path, sheets=1, machines=3, seed=5)
+    cache = GridCache(str(tmp_path / "cache"))
+    with WorkbookCache(path, DEFECTS_REGIONS, grid_cache=cache) as workbook:
+        sheet_name = workbook.sheet_names[0]
+        expected = workbook.grid(sheet_name)
+
+    [entry] = glob.glob(str(tmp_path / "cache" / "*.parquet"))
+    with open(entry, "r+b") as f:
+        corrupt(f)
+
+    with WorkbookCache(path, DEFECTS_REGIONS, grid_cache=cache) as workbook:
+        pd.testing.assert_frame_equal(workbook.grid(sheet_name), expected)
+    assert "Dropping unreadable grid cache entry" in capsys.readouterr().out
+    pd.read_parquet(entry)  # Rewritten by the new decode
+    with WorkbookCache(path, DEFECTS_REGIONS, grid_cache=cache) as workbook:
+        pd.testing.assert_frame_equal(workbook.grid(sheet_name), expected)
+    assert "Dropping" not in capsys.readouterr().out
@@ -0,0 +1,86 @@
+import os
+import uuid
+import pandas as pd
+import pytest
+from pandas.api.types import is_float_dtype, is_integer_dtype
+from pipeline import TABLES, extract_all, upload_all
+from synthetic import generate_workbook
+from writer import NATURAL_KEYS
+
+# A throwaway PostgreSQL to load into, e.g. "postgresql://postgres@localhost/jg_test"; the tests are skipped without it
+TEST_DSN_ENV = "JG_TEST_PG_DSN"
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2 import sql  # noqa: E402
+from psycopg2.extensions import make_dsn  # noqa: E402
+from pgcopy import CopyWriter, connect_pool  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not os.environ.get(TEST_DSN_ENV), reason=f"set {TEST_DSN_ENV} to test the COPY loader")
+
+
+def _sql_type(series: pd.Series) -> str:
+    if is_integer_dtype(series):
+        return "bigint"
+    if is_float_dtype(series):
+        return "double precision"
+    return "text"
+
+
+@pytest.fixture
+def tables(tmp_path):
+    path = str(tmp_path / "F1 PROD REPORT JAN 2025.xlsx")
+    generate_workbook(path, sheets=3, machines=4, seed=3)
+    return extract_all(path)
+
+
+@pytest.fixture
+def dsn(tables):
+    """A fresh schema holding the three tables as Supabase creates them: identity id, unique natural key."""
+    schema = f"jg_test_{uuid.uuid4().hex[:8]}"
+    conn = psycopg2.connect(os.environ[TEST_DSN_ENV])
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+        for name, df in tables.items():
+            table = TABLES[name]
+            columns = [sql.SQL("id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY")]
+            columns += [sql.SQL("{} {}").format(sql.Identifier(col), sql.SQL(_sql_type(df[col]))) for col in df.columns]
+            columns.append(sql.SQL("UNIQUE ({})").format(sql.SQL(", ").join(map(sql.Identifier, NATURAL_KEYS[table]))))
+            cur.execute(sql.SQL("CREATE TABLE {}.{} ({})").format(
+                sql.Identifier(schema), sql.Identifier(table), sql.SQL(", ").join(columns)))
+    try:
+        yield make_dsn(os.environ[TEST_DSN_ENV], options=f"-c search_path={schema}")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(schema)))
+        conn.close()
+
+
+def _nulls_as_none(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype(object).where(df.notna(), None)
+
+
+def _read(dsn: str, table: str, columns) -> pd.DataFrame:
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("SELECT {} FROM {}").format(
+                sql.SQL(", ").join(map(sql.Identifier, columns)), sql.Identifier(table)))
+            return pd.DataFrame(cur.fetchall(), columns=list(columns))
+    finally:
+        conn.close()
+
+
+def test_copy_round_trip_and_rerun(dsn, tables):
+    for _ in range(2):  # The re-run must update in place, not add rows
+        writer = CopyWriter(connect_pool(dsn), chunk_size=7)
+        try:
+            upload_all(writer, tables)
+        finally:
+            writer.close()
+
+    for name, df in tables.items():
+        table, key = TABLES[name], list(NATURAL_KEYS[TABLES[name]])
+        expected = df.drop_duplicates(key, keep="last").sort_values(key).reset_index(drop=True)
+        loaded = _read(dsn, table, df.columns).sort_values(key).reset_index(drop=True)
+        assert len(loaded) == len(expected) == len(loaded.drop_duplicates(key))
+        pd.testing.assert_frame_equal(_nulls_as_none(loaded), _nulls_as_none(expected), check_dtype=False, check_names=False)
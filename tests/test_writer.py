@@ -0,0 +1,197 @@
+import threading
+import time
+import types
+import pytest
+import writer
+from writer import BatchWriter
+
+TABLE = "jg_containers_defects"  # Natural key Date, MC, Shift
+
+
+def _records(count: int, start: int = 0):
+    return [{"Date": "2025.01.01", "MC": f"F{i:04d}", "Shift": "A", "IC_Percent": float(i)} for i in range(start, start + count)]
+
+
+class FlakyClient:
+    """
+    Supabase-like client: ``table(name).upsert(rows, on_conflict=...).execute()``.
+    Each chunk (told apart by its first row) fails ``failures`` times before it succeeds;
+    ``failing`` picks the chunks that fail at all. Calls can be slowed down or held on a gate.
+    """
+    def __init__(self, failures: int = 0, failing=lambda rows: True, delay: float = 0.0, gate=None):
+        self.failures = failures
+        self.failing = failing
+        self.delay = delay
+        self.gate = gate
+        self.lock = threading.Lock()
+        self.attempts = {}  # First row's MC -> attempts
+        self.sent = []  # (table, rows, on_conflict) of every successful call
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def table(self, name: str):
+        return types.SimpleNamespace(upsert=lambda rows, on_conflict=None: self._call(name, rows, on_conflict),
+                                     insert=lambda rows: self._call(name, rows, None))
+
+    def _call(self, table, rows, on_conflict):
+        return types.SimpleNamespace(execute=lambda: self._execute(table, rows, on_conflict))
+
+    def _execute(self, table, rows, on_conflict):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            chunk = rows[0]["MC"]
+            self.attempts[chunk] = self.attempts.get(chunk, 0) + 1
+            fail = self.failing(rows) and self.attempts[chunk] <= self.failures
+        try:
+            if self.gate is not None:
+                self.gate.wait()
+            time.sleep(self.delay)
+            if fail:
+                raise ConnectionError(f"attempt {self.attempts[chunk]} failed")
+            with self.lock:
+                self.sent.append((table, list(rows), on_conflict))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def chunk_sizes(self):
+        return sorted(len(rows) for _, rows, _ in self.sent)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the retry delays instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(writer, "time", types.SimpleNamespace(sleep=delays.append, perf_counter=time.perf_counter))
+    return delays
+
+
+def test_write_sends_chunks_upserted_on_natural_key(sleeps):
+    client = FlakyClient()
+    stats = BatchWriter(client, chunk_size=500).write(TABLE, _records(1234))
+    assert client.chunk_sizes() == [234, 500, 500]
+    assert {on_conflict for _, _, on_conflict in client.sent} == {"Date,MC,Shift"}
+    assert sorted(record["MC"] for _, rows, _ in client.sent for record in rows) == [f"F{i:04d}" for i in range(1234)]
+    assert (stats["rows"], stats["chunks"], stats["failed_chunks"]) == (1234, 3, 0)
+    assert sleeps == []
+
+
+def test_write_keeps_at_most_max_concurrency_chunks_in_flight(sleeps):
+    client = FlakyClient(delay=0.02)
+    BatchWriter(client, chunk_size=10, max_concurrency=3).write(TABLE, _records(100))
+    assert len(client.sent) == 10
+    assert 1 < client.max_in_flight <= 3
+
+
+def test_write_retries_with_exponential_backoff(sleeps):
+    client = FlakyClient(failures=2)
+    stats = BatchWriter(client, chunk_size=50, max_concurrency=1, max_retries=3, backoff=0.5).write(TABLE, _records(100))
+    assert client.attempts == {"F0000": 3, "F0050": 3}
+    assert sleeps == [0.5, 1.0, 0.5, 1.0]
+    assert client.chunk_sizes() == [50, 50]
+    assert stats["failed_chunks"] == 0
+
+
+def test_write_raises_once_retries_are_exhausted(sleeps):
+    client = FlakyClient(failures=10, failing=lambda rows: rows[0]["MC"] == "F0050")
+    with pytest.raises(RuntimeError, match=r"1 of 3 chunks \(50 rows\) to jg_containers_defects failed"):
+        BatchWriter(client, chunk_size=50, max_retries=2, backoff=0.1).write(TABLE, _records(150))
+    assert client.attempts["F0050"] == 3  # The first attempt and 2 retries
+    assert sorted(sleeps) == [0.1, 0.2]
+    assert client.chunk_sizes() == [50, 50]  # The other chunks are still sent
+
+
+def test_stream_sends_full_chunks_and_flushes_the_rest_on_close(sleeps):
+    client = FlakyClient()
+    stream = BatchWriter(client, chunk_size=500).stream()
+    for start in (0, 300, 600):
+        stream.send(TABLE, _records(300, start))
+    stats = stream.close()
+    assert client.chunk_sizes() == [400, 500]
+    assert (stats[TABLE]["rows"], stats[TABLE]["chunks"]) == (900, 2)
+
+
+def test_stream_does_not_flush_after_an_error(sleeps):
+    client = FlakyClient()
+    with pytest.raises(KeyError):
+        with BatchWriter(client, chunk_size=500).stream() as stream:
+            stream.send(TABLE, _records(300))
+            raise KeyError("extract failed")
+    assert client.sent == []
+
+
+def test_stream_close_raises_when_a_chunk_still_fails(sleeps):
+    client = FlakyClient(failures=10, failing=lambda rows: rows[0]["MC"] == "F0000")
+    stream = BatchWriter(client, chunk_size=100, max_retries=1).stream()
+    stream.send(TABLE, _records(250))
+    with pytest.raises(RuntimeError, match="chunk of 100 rows to jg_containers_defects failed"):
+        stream.close()
+    assert client.chunk_sizes() == [50, 100]
+
+
+def _final_rows(client):
+    """What the table holds after the successful calls, in the order they landed."""
+    rows = {}
+    for _, sent, _ in client.sent:
+        rows.update((record["MC"], record["IC_Percent"]) for record in sent)
+    return rows
+
+
+def test_write_keeps_the_last_row_per_key(sleeps, capsys):
+    records = _records(3) + [dict(_records(1, 1)[0], IC_Percent=-1.0)]
+    BatchWriter(FlakyClient(), chunk_size=2).write(TABLE, records)
+    assert "Dropped 1 rows with a duplicate Date+MC+Shift key" in capsys.readouterr().out
+
+
+def test_stream_keeps_the_last_row_per_key_across_batches(sleeps, capsys):
+    client = FlakyClient()
+    stream = BatchWriter(client, chunk_size=500).stream()
+    stream.send(TABLE, _records(3))
+    stream.send(TABLE, [dict(record, IC_Percent=-1.0) for record in _records(2, 1)])
+    stream.close()
+    assert client.chunk_sizes() == [3]
+    assert _final_rows(client) == {"F0000": 0.0, "F0001": -1.0, "F0002": -1.0}
+    assert "Dropped 2 rows with a duplicate Date+MC+Shift key" in capsys.readouterr().out
+
+
+def test_stream_sends_a_repeated_key_only_once_its_earlier_chunk_landed():
+    gate = threading.Event()
+    client = FlakyClient(gate=gate)
+    stream = BatchWriter(client, chunk_size=2, max_concurrency=4).stream()
+    later = [dict(record, IC_Percent=-1.0) for record in _records(2, 1)]  # F0001 is also in the first chunk
+    producer = threading.Thread(target=lambda: (stream.send(TABLE, _records(2)), stream.send(TABLE, later)))
+    producer.start()
+    time.sleep(0.2)
+    try:
+        assert len(client.attempts) == 1  # The second chunk waits although there is room in flight
+    finally:
+        gate.set()
+    producer.join(5)
+    stream.close()
+    assert _final_rows(client) == {"F0000": 0.0, "F0001": -1.0, "F0002": -1.0}
+
+
+def test_stream_applies_back_pressure():
+    gate = threading.Event()
+    client = FlakyClient(gate=gate)
+    stream = BatchWriter(client, chunk_size=10, max_concurrency=1).stream()  # At most 2 chunks queued or in flight
+    sent = []
+
+    def produce():
+        for start in range(0, 50, 10):
+            stream.send(TABLE, _records(10, start))
+            sent.append(start)
+    producer = threading.Thread(target=produce)
+    producer.start()
+    deadline = time.monotonic() + 5
+    while len(sent) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    try:
+        assert len(sent) == 2  # The third send waits for the first chunk
+    finally:
+        gate.set()
+    producer.join(5)
+    stats = stream.close()
+    assert len(sent) == 5 and stats[TABLE]["rows"] == 50
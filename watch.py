@@ -0,0 +1,187 @@
+import argparse
+import datetime
+import os
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+from openpyxl.utils import column_index_from_string
+from workbook import WorkbookCache
+from header import get_furnace_identifier
+from pipeline import ALL_REGIONS, SINKS, collect_workbooks, extract_workbook, store_tables, upload_tables
+from manifest import IngestManifest, file_hash, grid_hash
+from pgcopy import PG_DSN_ENV
+from readers import ENGINES, READER_ENGINE_ENV
+from store import STORE_DIR_ENV
+from schema import SOURCE_DATE_FORMAT
+import instrument
+
+
+def sheet_day(workbook: WorkbookCache, sheet: str) -> Optional[str]:
+    """The report day of a sheet (its V8 date, wherever layout finds it) as "YYYY-MM-DD", or None."""
+    value = workbook.grid(sheet).iloc[workbook.layout(sheet).date_row - 1, column_index_from_string("V") - 1]
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%Y-%m-%d")
+    try:
+        return datetime.datetime.strptime(str(value).strip(), SOURCE_DATE_FORMAT).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def pending_days(workbook: WorkbookCache, entry: Optional[Dict[str, object]]
+                 ) -> Tuple[List[str], Dict[str, str], Dict[str, str]]:
+    """
+    Find the day-sheets not ingested yet: a V8 date missing from the manifest entry, or whose sheet changed.
+    Sheets ingested by ``pipeline.py --manifest`` (same sheet hash) count as ingested too.
+    Returns:
+        Tuple: Sheets to ingest (workbook order), their sheet hashes and their {day: hash}
+    """
+    known = (entry or {}).get("days", {})
+    known_sheets = (entry or {}).get("sheets", {})
+    sheets, sheet_hashes, day_hashes = [], {}, {}
+    for sheet in workbook.sheet_names:
+        day = sheet_day(workbook, sheet)
+        if day is None:
+            print(f":warning: Skipping sheet '{sheet}' of {workbook.file_path}: no report date in V8")
+            workbook.evict(sheet)
+            continue
+        digest = grid_hash(workbook.grid(sheet))
+        if known.get(day) == digest or known_sheets.get(sheet) == digest:
+            workbook.evict(sheet)  # Already ingested
+            continue
+        sheets.append(sheet)
+        sheet_hashes[sheet] = digest
+        day_hashes[day] = digest
+    return sheets, sheet_hashes, day_hashes
+
+
+def ingest_new_days(file_path: str, entry: Optional[Dict[str, object]], upload: bool = True,
+                    sink: str = "rest", workers: int = 1, report_dir: Optional[str] = None) -> Dict[str, object]:
+    """
+    Extract and upload only the day-sheets of a workbook that are not ingested yet, never raising.
+    Returns:
+        Dict[str, object]: Like pipeline.run_file, plus "days" (the days ingested) and "day_hashes"
+    """
+    result = {"file": file_path, "furnace": get_furnace_identifier(os.path.basename(file_path)),
+              "seconds": 0.0, "rows": {}, "error": None, "hash": None, "sheet_hashes": {},
+              "days": [], "day_hashes": {}}
+    start = time.perf_counter()
+    with instrument.run("watch", report_dir, file=file_path, furnace=result["furnace"]) as report:
+        try:
+            result["hash"] = file_hash(file_path)
+            with WorkbookCache(file_path, ALL_REGIONS) as workbook:
+                sheets, result["sheet_hashes"], result["day_hashes"] = pending_days(workbook, entry)
+                result["days"] = sorted(result["day_hashes"])
+                if sheets:
+                    workbook.select_sheets(sheets)
+                    tables = extract_workbook(workbook, workers)
+                    result["rows"] = {name: len(df) for name, df in tables.items()}
+                    store_tables(file_path, tables)
+                    if upload:
+                        upload_tables(sink, tables)
+        except Exception:
+            result["error"] = traceback.format_exc()
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        report.context.update(rows=result["rows"], days=result["days"], error=result["error"])
+    return result
+
+
+class FolderWatcher:
+    """Poll a folder for new or modified workbooks and ingest their new day-sheets, resuming from the manifest."""
+    def __init__(self, patterns: List[str], manifest: IngestManifest, upload: bool = True, sink: str = "rest",
+                 settle: float = 10.0, workers: int = 1, report_dir: Optional[str] = None):
+        """
+        Args:
+            patterns (List[str]): Folders or glob patterns to watch (see pipeline.collect_workbooks)
+            manifest (IngestManifest): State file; ingested days are recorded after every successful upload
+            upload (bool): Send to the sink (False only extracts, and records nothing)
+            sink (str): "rest" or "copy" (see pipeline.make_writer)
+            settle (float): Seconds a workbook must stay unmodified before it is read (Excel may still be saving)
+            workers (int): Passed to pipeline.extract_workbook (the sheets are already decoded for their hashes)
+            report_dir (str, optional): Write a JSON run report per ingested workbook here
+        """
+        self.patterns = patterns
+        self.manifest = manifest
+        self.upload = upload
+        self.sink = sink
+        self.settle = settle
+        self.workers = workers
+        self.report_dir = report_dir
+        self._seen: Dict[str, Tuple[int, int]] = {}  # path -> (size, mtime_ns) last ingested or failed
+
+    def _changed(self, path: str) -> Optional[Tuple[int, int]]:
+        """The (size, mtime_ns) signature of a workbook to ingest, or None if it is unchanged or still being written."""
+        stat = os.stat(path)
+        if time.time() - stat.st_mtime < self.settle:
+            return None  # Still being written; look again on the next poll
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._seen.get(path) == signature:
+            return None
+        entry = self.manifest.entry(path)
+        if entry and entry.get("hash") == file_hash(path):
+            self._seen[path] = signature  # Ingested before a restart
+            return None
+        return signature
+
+    def poll(self) -> List[Dict[str, object]]:
+        """Ingest the new day-sheets of every new or modified workbook once; return one result per workbook handled."""
+        results = []
+        for path in collect_workbooks(self.patterns):
+            try:
+                signature = self._changed(path)
+            except OSError as e:
+                # Excel renames or locks the workbook while saving; try again on the next poll
+                print(f":warning: Skipping {os.path.basename(path)} for now: {e}")
+                continue
+            if signature is None:
+                continue
+            result = ingest_new_days(path, self.manifest.entry(path), self.upload, self.sink, self.workers, self.report_dir)
+            results.append(result)
+            self._seen[path] = signature  # Failed or not, read it again only once it changes
+            if result["error"]:
+                print(f":warning: {path} failed, retrying on the next change:\n{result['error']}")
+                continue
+            if self.upload:
+                self.manifest.record(path, result["hash"], result["sheet_hashes"], result["day_hashes"])
+                self.manifest.save()
+            days = ", ".join(result["days"]) or "no new days"
+            print(f":white_check_mark: {os.path.basename(path)}: {days} in {result['seconds']}s")
+        return results
+
+    def run(self, interval: float = 30.0) -> None:
+        """Poll every interval seconds until interrupted."""
+        print(f":eyes: Watching {', '.join(self.patterns)} every {interval:g}s (Ctrl+C to stop)")
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n:wave: Stopped watching")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch folders for JG production reports and ingest new day-sheets.")
+    parser.add_argument("paths", nargs="+", help="Folders or glob patterns to watch (e.g. 'E:\\proj1')")
+    parser.add_argument("--interval", type=float, default=30, help="Seconds between polls")
+    parser.add_argument("--settle", type=float, default=10, help="Seconds a workbook must be unmodified before it is read")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit (e.g. from a scheduler)")
+    parser.add_argument("--manifest", default="ingest_manifest.json", help="State file shared with pipeline.py")
+    parser.add_argument("--no-upload", action="store_true", help="Extract only, do not send or record anything")
+    parser.add_argument("--sink", choices=SINKS, default="rest")
+    parser.add_argument("--pg-dsn", help="PostgreSQL connection string for --sink copy (default: config.DB_CONFIG)")
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="Spreadsheet reader: calamine if installed (auto), or force calamine/openpyxl")
+    parser.add_argument("--store", help="Also keep the tables as Parquet here (by furnace/month), with daily and monthly rollups")
+    parser.add_argument("--sheet-workers", type=int, default=1)
+    parser.add_argument("--report-dir", default="run_reports", help="JSON run report per ingested workbook; '' to disable")
+    args = parser.parse_args()
+    if args.pg_dsn:
+        os.environ[PG_DSN_ENV] = args.pg_dsn
+    if args.store:
+        os.environ[STORE_DIR_ENV] = args.store
+    os.environ[READER_ENGINE_ENV] = args.engine  # Also seen by worker processes
+    watcher = FolderWatcher(args.paths, IngestManifest(args.manifest), upload=not args.no_upload, sink=args.sink,
+                            settle=args.settle, workers=args.sheet_workers, report_dir=args.report_dir)
+    if args.once:
+        watcher.poll()
+    else:
+        watcher.run(args.interval)
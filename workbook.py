@@ -0,0 +1,243 @@
+import re
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.utils import column_index_from_string
+from gridcache import GridCache
+from layout import Layout, LayoutIndex
+from readers import open_reader
+import instrument
+
+
+@dataclass(frozen=True)
+class Region:
+    """
+    A block of cells an extractor needs from every sheet.
+    Rows are 1-based Excel rows and columns are Excel letters. When ``max_row`` is None the
+    block ends at the first row (inclusive) where one of ``stop_cols`` matches ``stop_pattern``;
+    if ``start_pattern`` is set, that search only begins after the first row where
+    ``start_col`` matches it.
+    """
+    name: str
+    min_row: int
+    max_row: Optional[int] = None
+    min_col: str = "A"
+    max_col: Optional[str] = None
+    start_col: Optional[str] = None
+    start_pattern: Optional[str] = None
+    stop_cols: Tuple[str, ...] = ()
+    stop_pattern: Optional[str] = None
+
+
+class _RegionScan:
+    """Track whether a region has been fully read while rows stream past."""
+    def __init__(self, region: Region):
+        self.region = region
+        self.started = region.start_pattern is None
+        self.done = False
+        self._start = re.compile(region.start_pattern) if region.start_pattern else None
+        self._stop = re.compile(region.stop_pattern) if region.stop_pattern else None
+        self._start_idx = column_index_from_string(region.start_col) - 1 if region.start_col else None
+        self._stop_idx = [column_index_from_string(col) - 1 for col in region.stop_cols]
+
+    def feed(self, row_number: int, values: List[object]) -> None:
+        region = self.region
+        if self.done or row_number < region.min_row:
+            return
+        if region.max_row is not None and row_number >= region.max_row:
+            self.done = True
+        if not self.started:
+            self.started = _matches(self._start, values, [self._start_idx])
+            return
+        if self._stop is not None and _matches(self._stop, values, self._stop_idx):
+            self.done = True
+
+
+def _matches(pattern, values: List[object], indices: List[int]) -> bool:
+    for idx in indices:
+        if idx < len(values) and pd.notna(values[idx]) and pattern.search(str(values[idx])):
+            return True
+    return False
+
+
+def _convert_cell(value: object) -> object:
+    """
+    Mirror pandas' openpyxl conversion: empty/error cells -> NaN, whole floats -> int.
+    Whitespace-only text is NaN too, since calamine reads it as an empty cell.
+    """
+    if value is None:
+        return np.nan
+    if isinstance(value, str) and (value in ERROR_CODES or not value.strip()):
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def read_regions(worksheet, regions: Iterable[Region]) -> pd.DataFrame:
+    """
+    Stream a worksheet once and return the grid covering the given regions.
+    Reading stops as soon as every region is complete, and only columns up to the widest
+    region are decoded. The grid is in absolute coordinates: ``grid.iloc[r - 1, c - 1]`` is
+    Excel cell (r, c); cells above and left of the regions are NaN.
+    Args:
+        worksheet: openpyxl (read-only) worksheet, or a reader's worksheet with the same iter_rows
+        regions (Iterable[Region]): Regions required by the extractors; empty reads the whole sheet
+    Returns:
+        pd.DataFrame: Raw cell values
+    """
+    scans = [_RegionScan(region) for region in regions]
+    min_row = min((scan.region.min_row for scan in scans), default=1)
+    min_col = min((column_index_from_string(scan.region.min_col) for scan in scans), default=1)
+    max_col = None
+    if scans and all(scan.region.max_col for scan in scans):
+        max_col = max(column_index_from_string(scan.region.max_col) for scan in scans)
+    rows: List[List[object]] = [[] for _ in range(min_row - 1)]
+    for row_number, values in enumerate(
+        worksheet.iter_rows(min_row=min_row, min_col=min_col, max_col=max_col, values_only=True), start=min_row
+    ):
+        values = [np.nan] * (min_col - 1) + [_convert_cell(value) for value in values]
+        rows.append(values)
+        for scan in scans:
+            scan.feed(row_number, values)
+        if scans and all(scan.done for scan in scans):
+            break
+    width = max((len(row) for row in rows), default=0)
+    return pd.DataFrame([row + [np.nan] * (width - len(row)) for row in rows], dtype=object)
+
+
+class WorkbookCache:
+    """Open an Excel report once and decode each sheet into a raw grid at most once."""
+    def __init__(self, file_path: str, regions: Iterable[Region] = (), grid_cache: Optional[GridCache] = None,
+                 engine: Optional[str] = None):
+        """
+        Initialize the cache for an Excel file.
+        Args:
+            file_path (str): Path to the Excel file containing the production report
+            regions (Iterable[Region]): Regions to decode from each sheet; more can be added with add_regions
+            grid_cache (GridCache, optional): On-disk grid cache; defaults to GridCache.from_env().
+                When every grid is cached the workbook is never opened.
+            engine (str, optional): Reader engine, "calamine", "openpyxl" or "auto" (see readers.open_reader)
+        """
+        self.file_path = file_path
+        self.engine = engine
+        self.grid_cache = grid_cache if grid_cache is not None else GridCache.from_env()
+        self._book = None
+        self._cache_written = False
+        self.regions: List[Region] = []
+        self._grids: Dict[str, pd.DataFrame] = {}
+        self.layouts = LayoutIndex()
+        self._layouts: Dict[str, Layout] = {}
+        self.add_regions(regions)
+        with instrument.stage("workbook_open") as record:
+            self._all_sheet_names = self._load_sheet_names()
+            record["rows_out"] = len(self._all_sheet_names)
+        self.sheet_names: List[str] = list(self._all_sheet_names)
+
+    @property
+    def book(self):
+        """The workbook reader (calamine or openpyxl, see readers.open_reader), opened on first use."""
+        if self._book is None:
+            self._book = open_reader(self.file_path, self.engine)
+        return self._book
+
+    def _fingerprint(self) -> str:
+        regions_key = "|".join(sorted(repr(region) for region in self.regions))
+        return GridCache.fingerprint(self.file_path, regions_key)
+
+    def _load_sheet_names(self) -> List[str]:
+        if self.grid_cache is None:
+            return self.book.sheet_names
+        fingerprint = GridCache.fingerprint(self.file_path, "")
+        sheet_names = self.grid_cache.get_sheet_names(fingerprint)
+        if sheet_names is None:
+            sheet_names = self.book.sheet_names
+            self.grid_cache.put_sheet_names(fingerprint, sheet_names)
+        return sheet_names
+
+    def add_regions(self, regions: Iterable[Region]) -> None:
+        """Register regions an extractor needs; grids decoded for a smaller set are dropped."""
+        new = [region for region in regions if region not in self.regions]
+        if new:
+            self.regions.extend(new)
+            self._grids.clear()
+            self._layouts.clear()
+
+    def grid(self, sheet_name: str) -> pd.DataFrame:
+        """
+        Return the raw cell grid of a sheet, reading it on first use only.
+        Only the rows and columns covered by the registered regions are decoded.
+        The grid has no header row: ``grid.iloc[r - 1, c - 1]`` is Excel cell (r, c).
+        Args:
+            sheet_name (str): Name of the sheet to read
+        Returns:
+            pd.DataFrame: Raw cell values (empty cells are NaN)
+        """
+        if sheet_name not in self._grids:
+            with instrument.stage("sheet_read", sheet_name) as record:
+                grid = None
+                if self.grid_cache is not None:
+                    grid = self.grid_cache.get(self._fingerprint(), sheet_name)
+                record["source"] = "grid_cache" if grid is not None else self.book.name
+                if grid is None:
+                    grid = read_regions(self.book.worksheet(sheet_name), self.regions)
+                    if self.grid_cache is not None:
+                        self.grid_cache.put(self._fingerprint(), sheet_name, grid)
+                        self._cache_written = True
+                record["rows_out"] = len(grid)
+            self._grids[sheet_name] = grid
+        return self._grids[sheet_name]
+
+    def is_decoded(self, sheet_name: str) -> bool:
+        """Whether the sheet's grid is already decoded in this process."""
+        return sheet_name in self._grids
+
+    def layout(self, sheet_name: str) -> Layout:
+        """
+        Return the anchors (date, header, Total, Shift and "Da..." rows) of a sheet, found once.
+        A layout found on an earlier sheet with the same template is reused after a cheap check.
+        Args:
+            sheet_name (str): Name of the sheet
+        Returns:
+            Layout: The sheet's anchors
+        """
+        if sheet_name not in self._layouts:
+            grid = self.grid(sheet_name)
+            with instrument.stage("layout", sheet_name) as record:
+                self._layouts[sheet_name], reused = self.layouts.detect(grid)
+                record["source"] = "template" if reused else "scan"
+        return self._layouts[sheet_name]
+
+    def select_sheets(self, sheet_names: Iterable[str]) -> None:
+        """Restrict sheet_names (what the extractors iterate) to the given sheets, keeping workbook order."""
+        wanted = set(sheet_names)
+        self.sheet_names = [sheet for sheet in self._all_sheet_names if sheet in wanted]
+
+    def str_grid(self, sheet_name: str) -> pd.DataFrame:
+        """Return a fresh copy of the sheet grid with every non-empty cell as ``str`` (like ``dtype=str``)."""
+        grid = self.grid(sheet_name)
+        return grid.astype(str).where(grid.notna(), np.nan)
+
+    def evict(self, sheet_name: str) -> None:
+        """Drop a decoded sheet from the cache."""
+        self._grids.pop(sheet_name, None)
+        self._layouts.pop(sheet_name, None)
+
+    def close(self) -> None:
+        """Release the cached grids and the underlying workbook handle."""
+        self._grids.clear()
+        self._layouts.clear()
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+        if self._cache_written:
+            self.grid_cache.evict()
+            self._cache_written = False
+
+    def __enter__(self) -> "WorkbookCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,229 @@
+import math
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+import instrument
+from schema import SCHEMAS
+
+# Natural key of each table (declared in schema.py); rows are upserted on these columns so
+# re-runs do not duplicate. Each needs a matching unique constraint in the database.
+NATURAL_KEYS: Dict[str, Tuple[str, ...]] = {name: schema.key for name, schema in SCHEMAS.items()}
+
+
+def key_of(record: Dict, key: Sequence[str]) -> tuple:
+    """The natural key values of a record."""
+    return tuple(record.get(col) for col in key)
+
+
+def dedupe_on_key(records: List[Dict], key: Sequence[str], table: str) -> List[Dict]:
+    """Keep the last record per natural key (an upsert batch may not touch a row twice), warning about the others."""
+    latest = {key_of(record, key): record for record in records}
+    if len(latest) < len(records):
+        print(f":warning: Dropped {len(records) - len(latest)} rows with a duplicate {'+'.join(key)} key for {table}")
+    return list(latest.values())
+
+
+class BatchWriter:
+    """Upsert records (on NATURAL_KEYS) into a Supabase table in concurrent, retried chunks."""
+    def __init__(self, client, chunk_size: int = 500, max_concurrency: int = 4,
+                 max_retries: int = 3, backoff: float = 1.0):
+        """
+        Initialize the writer.
+        Args:
+            client: Supabase ``Client`` (or anything with ``table(name).insert/upsert(rows).execute()``)
+            chunk_size (int): Records per request
+            max_concurrency (int): Chunks in flight at once
+            max_retries (int): Retries per chunk after the first attempt
+            backoff (float): Initial retry delay in seconds, doubled on every retry
+        """
+        self.client = client
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def _send_once(self, table: str, chunk: List[Dict], key: Optional[Sequence[str]]) -> None:
+        if key:
+            self.client.table(table).upsert(chunk, on_conflict=",".join(key)).execute()
+        else:
+            self.client.table(table).insert(chunk).execute()
+
+    def _send(self, table: str, chunk: List[Dict], key: Optional[Sequence[str]]) -> None:
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._send_once(table, chunk, key)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f":warning: Chunk of {len(chunk)} rows to {table} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+    def close(self) -> None:
+        """Release the writer's connections (nothing to do for the REST client)."""
+
+    def stream(self) -> "RecordStream":
+        """Open a RecordStream that sends records in chunks as they are produced."""
+        return RecordStream(self)
+
+    def write(self, table: str, records: List[Dict], key: Optional[Sequence[str]] = None) -> Dict[str, object]:
+        """
+        Upsert (or insert) records into a table.
+        Args:
+            table (str): Target table name
+            records (List[Dict]): Rows to send (already JSON-safe, NaN replaced by None)
+            key (Sequence[str], optional): Natural key columns; defaults to NATURAL_KEYS[table]
+        Returns:
+            Dict[str, object]: rows sent, chunks sent, failed chunk count, seconds and rows_per_sec
+        Raises:
+            RuntimeError: If any chunk still fails after all retries (the others are still sent)
+        """
+        with instrument.stage("upload", rows_in=len(records)) as record:
+            stats = self._write(table, records, key)
+            record.update(table=table, rows_out=stats["rows"], rows_per_sec=stats["rows_per_sec"])
+        if stats["failed_chunks"]:
+            raise RuntimeError(stats["error"])
+        return stats
+
+    def _write(self, table: str, records: List[Dict], key: Optional[Sequence[str]]) -> Dict[str, object]:
+        start = time.perf_counter()
+        key = key if key is not None else NATURAL_KEYS.get(table)
+        if key:
+            records = dedupe_on_key(records, key, table)
+        chunks = [records[i:i + self.chunk_size] for i in range(0, len(records), self.chunk_size)]
+        errors: List[Optional[BaseException]] = []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(chunks)))) as pool:
+            futures = [pool.submit(self._send, table, chunk, key) for chunk in chunks]
+            for future in futures:
+                errors.append(future.exception())
+        seconds = time.perf_counter() - start
+        failed = [(chunk, error) for chunk, error in zip(chunks, errors) if error is not None]
+        rows = sum(len(chunk) for chunk, error in zip(chunks, errors) if error is None)
+        stats = {
+            "table": table,
+            "rows": rows,
+            "chunks": len(chunks),
+            "failed_chunks": len(failed),
+            "seconds": round(seconds, 2),
+            "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else math.inf,
+            "error": None,
+        }
+        print(f":white_check_mark: Wrote {rows} rows to {table} in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec)")
+        if failed:
+            lost = sum(len(chunk) for chunk, _ in failed)
+            stats["error"] = f"{len(failed)} of {len(chunks)} chunks ({lost} rows) to {table} failed: {failed[0][1]}"
+        return stats
+
+
+class RecordStream:
+    """
+    Send record batches (e.g. one sheet at a time) through a BatchWriter as they arrive.
+    Records are buffered per table and sent in chunk_size chunks; at most 2 * max_concurrency
+    chunks are queued or in flight, so memory stays bounded however many batches are sent.
+    As with BatchWriter.write, the last record per natural key wins across the whole stream:
+    the buffer keeps one record per key, and a chunk repeating a key of a chunk still in flight
+    is only sent once that chunk has landed.
+    """
+    def __init__(self, writer: BatchWriter):
+        self.writer = writer
+        self._pool = ThreadPoolExecutor(max_workers=max(1, writer.max_concurrency))
+        self._max_pending = 2 * max(1, writer.max_concurrency)
+        self._pending: Deque[Tuple[str, List[Dict], Future]] = deque()
+        self._buffers: Dict[str, List[Dict]] = {}
+        self._keys: Dict[str, Optional[Sequence[str]]] = {}
+        self._in_flight: Dict[str, Dict[tuple, Future]] = {}  # Per table: natural key -> chunk sending it
+        self._stats: Dict[str, Dict[str, object]] = {}
+        self._start = time.perf_counter()
+
+    def send(self, table: str, records: List[Dict], key: Optional[Sequence[str]] = None) -> None:
+        """
+        Queue records for a table; full chunks are submitted right away.
+        Args:
+            table (str): Target table name
+            records (List[Dict]): Rows to send (already JSON-safe, NaN replaced by None)
+            key (Sequence[str], optional): Natural key columns; defaults to NATURAL_KEYS[table]
+        """
+        with instrument.stage("upload", rows_in=len(records)) as record:
+            key = self._keys.setdefault(table, key if key is not None else NATURAL_KEYS.get(table))
+            self._stats.setdefault(table, {"table": table, "rows": 0, "chunks": 0, "failed_chunks": 0, "error": None})
+            buffer = self._buffers.setdefault(table, [])
+            buffer.extend(records)
+            if key:
+                buffer[:] = dedupe_on_key(buffer, key, table)  # Also drops rows repeated across batches
+            while len(buffer) >= self.writer.chunk_size:
+                self._submit(table, buffer[:self.writer.chunk_size])
+                del buffer[:self.writer.chunk_size]
+            record.update(table=table, rows_out=len(records))
+
+    def _submit(self, table: str, chunk: List[Dict]) -> None:
+        key = self._keys[table]
+        in_flight = self._in_flight.setdefault(table, {})
+        if key:
+            # A key already sent in a chunk still in flight: let that chunk land first, so this row wins
+            earlier = {in_flight[k] for k in (key_of(record, key) for record in chunk) if k in in_flight}
+            while earlier:
+                entry = self._pending.popleft()
+                self._collect(*entry)
+                earlier.discard(entry[2])
+        while len(self._pending) >= self._max_pending:
+            self._collect(*self._pending.popleft())  # Back-pressure: wait for the oldest chunk
+        future = self._pool.submit(self.writer._send, table, chunk, key)
+        if key:
+            in_flight.update((key_of(record, key), future) for record in chunk)
+        self._pending.append((table, chunk, future))
+
+    def _collect(self, table: str, chunk: List[Dict], future: Future) -> None:
+        key = self._keys[table]
+        if key:
+            in_flight = self._in_flight[table]
+            for record in chunk:
+                if in_flight.get(key_of(record, key)) is future:
+                    del in_flight[key_of(record, key)]
+        stats = self._stats[table]
+        stats["chunks"] += 1
+        error = future.exception()
+        if error is None:
+            stats["rows"] += len(chunk)
+        else:
+            stats["failed_chunks"] += 1
+            if stats["error"] is None:
+                stats["error"] = f"chunk of {len(chunk)} rows to {table} failed: {error}"
+
+    def close(self) -> Dict[str, Dict[str, object]]:
+        """
+        Send the remaining buffered records and wait for every chunk.
+        Returns:
+            Dict[str, Dict[str, object]]: Per table: rows sent, chunks sent, failed chunk count, seconds and rows_per_sec
+        Raises:
+            RuntimeError: If any chunk still failed after all retries (the others are still sent)
+        """
+        try:
+            for table, buffer in self._buffers.items():
+                if buffer:
+                    self._submit(table, list(buffer))
+                    buffer.clear()
+            while self._pending:
+                self._collect(*self._pending.popleft())
+        finally:
+            self._pool.shutdown(wait=True)
+        seconds = time.perf_counter() - self._start
+        for stats in self._stats.values():
+            stats["seconds"] = round(seconds, 2)
+            stats["rows_per_sec"] = round(stats["rows"] / seconds, 1) if seconds > 0 else math.inf
+            print(f":white_check_mark: Wrote {stats['rows']} rows to {stats['table']} in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec)")
+        errors = [stats["error"] for stats in self._stats.values() if stats["failed_chunks"]]
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return self._stats
+
+    def __enter__(self) -> "RecordStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if exc[0] is None:
+            self.close()
+        else:
+            self._pool.shutdown(wait=True)